@@ -0,0 +1,85 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Benchmarks for the Everdo export.
+
+Run from the project root, with the package installed or in `PYTHONPATH`::
+
+    python benchmarks/bench_everdo.py
+
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import time
+import resource
+import multiprocessing
+
+from todoist_gtd_utils import everdo
+
+
+class DictItem(object):
+    """The previous item, with a dict per instance. For comparison only."""
+
+    def __init__(self, parent, list_type, title, note='', tags=(), id=None):
+        self.data = {
+                'id': id or everdo.gen_uuid(),
+                'list': list_type,
+                'title': title,
+                'created_on': int(time.time()),
+                'is_focused': 0,
+                'start_date': None,
+                'schedule': None,
+                'completed_on': None,
+                'energy': None,
+                'time_estimate': None,
+                'due_date': None,
+                'recurrent_task_id': None,
+                'contact_id': None,
+                'tags': tags,
+                'repeated_on': None,
+                'note': note,
+                'type': 'a',
+                }
+        if parent:
+            self.data['parent_id'] = parent.data['id']
+
+
+def _create_and_measure(args):
+    """Create items and return the memory use, in MB. Runs in a child."""
+    cls, count = args
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    project = everdo.Everdo_Project('a', 'Project')
+    items = [cls(project, 'a', 'Item %d' % i, id=everdo.gen_uuid('item', i))
+             for i in xrange(count)]
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    assert len(items) == count
+    return (after - before) / 1024.0
+
+
+def bench_item_memory(count=200000):
+    for cls in (DictItem, everdo.Everdo_Action):
+        pool = multiprocessing.Pool(1)
+        used = pool.apply(_create_and_measure, ((cls, count),))
+        pool.close()
+        print("{} items of {}: {:.0f} MB, {:.0f} bytes per item".format(
+            count, cls.__name__, used, used * 1024 * 1024 / count))
+
+
+def bench_export(count=100000):
+    edo = everdo.Everdo_File()
+    project = everdo.Everdo_Project('a', 'Project')
+    edo.add_item(project, {'id': 0})
+    for i in xrange(1, count):
+        edo.add_item(everdo.Everdo_Action(project, 'a', 'Item %d' % i),
+                     {'id': i})
+    start = time.time()
+    edo.export(io.BytesIO())
+    print("Export {} items: {:.2f}s".format(count, time.time() - start))
+
+
+if __name__ == '__main__':
+    bench_item_memory()
+    bench_export()
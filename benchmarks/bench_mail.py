@@ -0,0 +1,155 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Benchmarks for the mail parsing.
+
+Run from the project root, with the package installed or in `PYTHONPATH`::
+
+    python benchmarks/bench_mail.py
+
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import os
+import time
+import base64
+import resource
+import tempfile
+import multiprocessing
+from quopri import ishex
+from quopri import unhex
+
+from todoist_gtd_utils import mail
+
+
+def decode_quoted_printable_loop(input, header=0, encoding='utf-8'):
+    """The previous, per character decoder. Kept for comparison only.
+
+    Note that this stops at the first blank line, which the new decoder
+    doesn't, so the input in the benchmark has no blank lines.
+
+    """
+    ESCAPE = '='
+    ret = []
+    new = bytearray()
+    for line in input.split('\n'):
+        if not line:
+            break
+        i = 0
+        n = len(line)
+        partial = 1
+        while i < n:
+            c = line[i]
+            if c == '_' and header:
+                new += bytearray(' ', encoding)
+                i = i+1
+            elif c != ESCAPE:
+                new += bytearray(c, encoding)
+                i = i+1
+            elif i+1 < n and line[i+1] == ESCAPE:
+                new += bytearray(ESCAPE, encoding)
+                i = i+2
+            elif i+2 < n and ishex(line[i+1]) and ishex(line[i+2]):
+                new.append(unhex(line[i+1:i+3]))
+                i = i+3
+            else:
+                new += bytearray(c, encoding)
+                i = i+1
+        if not partial:
+            ret.append(new.decode(encoding))
+            new = bytearray()
+    if new:
+        ret.append(new.decode(encoding))
+    return '\n'.join(ret)
+
+
+def get_qp_body(size):
+    """Return a quoted-printable body of around `size` characters"""
+    line = ("Hei p=C3=A5 deg, dette er en linje med =C3=A6, =C3=B8 og "
+            "=C3=A5 i=\n")
+    return line * (size // len(line))
+
+
+def timeit(func, *args):
+    start = time.time()
+    func(*args)
+    return time.time() - start
+
+
+def bench_decode_quoted_printable():
+    for size in (1, 4):
+        body = get_qp_body(size * 1024 * 1024)
+        old = timeit(decode_quoted_printable_loop, body)
+        new = timeit(mail.decode_quoted_printable, body)
+        print("decode_quoted_printable, {} MB: loop {:.3f}s, bulk {:.3f}s "
+              "({:.0f}x)".format(size, old, new, old / max(new, 1e-6)))
+
+
+def get_html_body(size):
+    """Return a newsletter like HTML body of around `size` characters"""
+    block = ('<div class="row"><style>.x { color: red }</style>'
+             '<table><tr><td><a href="https://example.com/">Read   more'
+             '</a></td><td><p>Some <b>fancy</b> &amp; news &aring;</p>'
+             '</td></tr></table></div>\n')
+    return '<html><body>{}</body></html>'.format(block * (size // len(block)))
+
+
+def bench_html_converters():
+    html = get_html_body(512 * 1024)
+    for name in sorted(mail.html_converters):
+        convert = mail.html_converters[name]
+        print("HTML converter {}, 512 KB: {:.3f}s, with 5000 chars budget: "
+              "{:.3f}s".format(name, timeit(convert, html),
+                               timeit(convert, html, 5000)))
+
+
+def write_attachment_mail(fp, size):
+    """Write a mail with a base64 attachment of `size` bytes to `fp`"""
+    fp.write(b'From: test@example.com\nSubject: Big attachment\n'
+             b'Content-Type: multipart/mixed; boundary="xyz"\n'
+             b'MIME-Version: 1.0\n\n--xyz\nContent-Type: text/plain\n\n'
+             b'See attachment\n\n--xyz\nContent-Type: application/pdf\n'
+             b'Content-Disposition: attachment; filename="big.pdf"\n'
+             b'Content-Transfer-Encoding: base64\n\n')
+    line = base64.b64encode(os.urandom(57)) + b'\n'
+    for i in xrange(size // 57):
+        fp.write(line)
+    fp.write(b'\n--xyz--\n')
+
+
+def _parse_and_measure(args):
+    """Parse the mail and return the peak memory, in MB. Runs in a child."""
+    filename, binary = args
+    if binary:
+        m = mail.SimpleMailParser.from_filename(filename)
+    else:
+        with io.open(filename, 'r', encoding='latin1') as f:
+            m = mail.SimpleMailParser(f)
+    m.get_body_text()
+    for a_type, a_name, a_content in m.iter_attachments():
+        len(a_content)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def bench_parse_attachment(size=50 * 1024 * 1024):
+    with tempfile.NamedTemporaryFile() as f:
+        write_attachment_mail(f, size)
+        f.flush()
+        for binary in (False, True):
+            pool = multiprocessing.Pool(1)
+            start = time.time()
+            peak = pool.apply(_parse_and_measure, ((f.name, binary),))
+            pool.close()
+            print("Parse mail with {} MB attachment, {} mode: {:.2f}s, peak "
+                  "memory {:.0f} MB".format(size // 1024 // 1024,
+                                            binary and 'binary' or 'text',
+                                            time.time() - start, peak))
+
+
+if __name__ == '__main__':
+    bench_decode_quoted_printable()
+    bench_html_converters()
+    bench_parse_attachment()
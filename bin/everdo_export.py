@@ -29,12 +29,15 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import argparse
-import re
+import collections
 import sys
 import time
 
 from todoist_gtd_utils import TodoistGTD
+from todoist_gtd_utils import attachments
+from todoist_gtd_utils import dates
 from todoist_gtd_utils import everdo
+from todoist_gtd_utils import exceptions
 from todoist_gtd_utils import userinput
 from todoist_gtd_utils import utils
 
@@ -49,158 +52,211 @@ def add_tags(edo, api):
         if label['color'] == 0:
             # Everdo handles Contexts somewhat special:
             title = '@' + title
-        edo.add_tag(everdo.Everdo_Tag(tag_type, title), label)
+        etag = everdo.Everdo_Tag(tag_type, title,
+                                 id=everdo.gen_uuid('label', label['id']))
+        edo.add_tag(etag, label)
         i += 1
     print("Added %d tags" % i)
 
 
-def add_inbox(edo, api):
-    i = 0
-    p = api.get_project_by_name('Inbox')
-    for item in p.get_child_items():
-        add_item(edo, api, item, list_type='i')
-        i += 1
-    print("Added %d items from Inbox" % i)
+class ExportIndex(object):
+    """Todoist data sorted in buckets, for exporting all in a single pass.
 
+    Everything is looked up by dicts, instead of scanning all projects, items
+    and notes for every project.
+
+    """
+    def __init__(self, api):
+        self.api = api
+        # Direct child projects, by parent project id. None for top level.
+        self.children = api.get_project_children()
+        self.items = {}
+        for item in api.items.all():
+            self.items.setdefault(item['project_id'], []).append(item)
+        self.notes = {}
+        for note in api.notes.all():
+            self.notes.setdefault(note['item_id'], []).append(note)
+        self.waiting_label = api.get_label_id('waiting',
+                                              raise_on_missing=False)
+        self.archived_labels = api.get_archived_labels()
+
+        # How to export the subtree of a project, by the project's id
+        self.roles = {api.get_project_by_name('Inbox')['id']: 'inbox'}
+        for p in api.get_targetprojects():
+            self.roles[p['id']] = 'active'
+        for p in api.get_somedaymaybe():
+            self.roles[p['id']] = 'someday'
+        for name in other_projects:
+            self.roles[api.get_project_by_name(name)['id']] = 'other'
+        for name in notebook_projects:
+            self.roles[api.get_project_by_name(name)['id']] = 'notebook'
+
+    def get_items(self, project):
+        return self.items.get(project['id'], ())
+
+
+""" Projects that are simply copied. Manual tweaks needed in Everdo. """
+other_projects = ("JobbRutiner", "PrivatRutiner", "Husarbeid", "Påminningar")
+
+""" Projects that are exported as notebooks """
+notebook_projects = ("Lesestund",)
+
+
+def add_projects(edo, index):
+    """Export the projects and their items, in one pass over the project tree.
+
+    The list type of the projects and items are given by the role of the
+    subtree they're in, see `ExportIndex.roles`. Projects outside of these
+    subtrees are not exported.
 
-def add_active_projects(edo, api):
-    added_projects = 0
-    added_items = 0
-    added_standalone_items = 0
-    for t in api.get_targetprojects():
+    """
+    stats = collections.Counter()
+
+    def visit(project, role, area):
+        own_role = index.roles.get(project['id'])
+        if own_role:
+            role = own_role
+            area = add_role_project(edo, index, project, role, stats)
+        elif role == 'active':
+            if add_project(edo, index, project, 'a', tags=[area], stats=stats):
+                stats['a_projects'] += 1
+        elif role == 'someday':
+            if add_project(edo, index, project, 'm', schedule=True,
+                           stats=stats):
+                stats['m_projects'] += 1
+
+        children = index.children.get(project['id'], ())
+        if own_role in ('inbox', 'other', 'notebook') and children:
+            print("WARN: {} has child projects. What to do?"
+                  .format(project['name']))
+        if role not in ('active', 'someday'):
+            # Only look for other roles further down
+            role = None
+        for child in children:
+            visit(child, role, area)
+
+    for project in index.children.get(None, ()):
+        visit(project, None, None)
+
+    print("Added %d items from Inbox" % stats['inbox'])
+    print("Added %d active projects, with %d items" % (stats['a_projects'],
+                                                       stats['a_items']))
+    print("Added %d standalone items" % stats['a_standalone'])
+    print("Added %d someday projects, with %d items" % (stats['m_projects'],
+                                                        stats['m_items']))
+    print("Added %d standalone someday items" % stats['m_standalone'])
+
+
+def add_role_project(edo, index, p, role, stats):
+    """Add a project that is the top of a subtree to export.
+
+    :rtype: str
+    :return: The id of the area tag for active projects, otherwise None.
+
+    """
+    if role == 'inbox':
+        for item in index.get_items(p):
+            add_item(edo, index, item, list_type='i')
+            stats['inbox'] += 1
+    elif role == 'active':
         # The target projects are my "areas" in Everdo (first guess)
-        area = everdo.Everdo_Tag('a', t['name'])
-        # edo.add_tag(area, t)
+        area = everdo.Everdo_Tag('a', p['name'],
+                                 id=everdo.gen_uuid('area', p['id']))
         edo.tags.append(area)
-
-        for p in t.get_child_projects():
-            if p['is_deleted']:
+        for item in index.get_items(p):
+            add_item(edo, index, item, parent=None)
+            stats['a_standalone'] += 1
+        return area.data['id']
+    elif role == 'someday':
+        for item in index.get_items(p):
+            add_item(edo, index, item, parent=None, list_type='m')
+            stats['m_standalone'] += 1
+    elif role == 'other':
+        if p['is_deleted']:
+            print("WARN: {} is deleted. What to do?".format(p['name']))
+            return
+        add_project(edo, index, p, 'a')
+    elif role == 'notebook':
+        if p['is_deleted']:
+            print("WARN: {} is deleted. What to do?".format(p['name']))
+            return
+        notebook = everdo.Everdo_Notebook('a', p['name'],
+                                          is_focused=p['is_favorite'],
+                                          completed_on=get_completed_on(p),
+                                          id=everdo.gen_uuid('project',
+                                                             p['id']))
+        edo.add_item(notebook, p)
+        for item in index.get_items(p):
+            if item['is_deleted']:
                 continue
-            completed_on = None
-            if p['is_archived']:
-                completed_on = int(time.time())
-            eproject = everdo.Everdo_Project(
-                    'a', p['name'], is_focused=p['is_favorite'],
-                    completed_on=completed_on, tags=[area.data['id']])
-            edo.add_item(eproject, p)
-            added_projects += 1
-
-            for item in p.get_child_items():
-                if item['is_deleted']:
-                    continue
-                if item.is_title():
-                    eproject.data['note'] += '\n' + item['content']
-                    edo.todoist2everdo.setdefault(item['id'],
-                                                  eproject.data['id'])
-                    continue
-                add_item(edo, api, item, parent=eproject)
-                added_items += 1
-
-        for item in t.get_child_items():
-            add_item(edo, api, item, parent=None)
-            added_standalone_items += 1
-
-    print("Added %d active projects, with %d items" % (added_projects,
-                                                       added_items))
-    print("Added %d standalone items" % added_standalone_items)
-
-
-def get_inactive_labels(item):
-    ret = set()
-    for match in re.findall('__[a-zA-ZæøåÆØÅ]+', item['content']):
-        lname = _escape_inactive_label(match)
-        try:
-            ret.add(item.api.get_label_id(lname))
-        except Exception:
-            # ignore missing labels
-            # print("Not found label: {}".format(e))
-            continue
-        item['content'] = item['content'].replace(match, '').strip()
-    return ret
+            add_item(edo, index, item, parent=notebook,
+                     everdo_cls=everdo.Everdo_Note)
 
 
-def _escape_inactive_label(labelname):
-    if labelname.startswith('__'):
-        return labelname[2:]
-    return labelname
+def get_completed_on(p):
+    if p['is_archived']:
+        return int(time.time())
+    return None
 
 
-def parse_datestring_to_schedule(datestring):
-    """Convert Todoists datestring to Everdo's schedule obejct.
+def add_project(edo, index, p, list_type, tags=(), schedule=False,
+                stats=None):
+    """Add a project with its items.
 
-    Some scenarios needs to be handled manually. Some mismatches:
+    :param schedule:
+        If True, the project is moved to the scheduled list if any of its
+        items has a due date.
 
-    - Everdo doesn't support time, only dates
+    :type stats: collections.Counter
+    :param stats: If given, the number of added items are counted in here.
 
-    - Workdays are handled as "days" - just me being lazy…
+    :rtype: Everdo_Project
+    :return: The added project, or None if the project is deleted.
 
     """
-    datestring = datestring.lower()
-
-    # TODO: Something's wrong here. Doesn't get imported by Everdo, but does so
-    # silently, so don't know why.
-
-    es = everdo.Everdo_Schedule
-    if ('every' not in datestring) and ('after' not in datestring):
-        # Not repeatable
-        return
-    m = re.match(r'(every|after)!? (?P<amount>\d+) (?P<unit>workday|day|week|'
-                 r'month|year)s?( (at )?\d\d:\d\d)?$', datestring)
-    if m:
-        amount = int(m.group('amount'))
-        unit = m.group('unit')
-        daysOfWeek = None
-        typ = 'Daily'
-        if unit == 'day':
-            typ = 'Daily'
-        elif unit == 'week':
-            typ = 'Weekly'
-        elif unit == 'month':
-            typ = 'Monthly'
-        elif unit == 'year':
-            typ = 'Yearly'
-        elif unit == 'workday':
-            typ = 'Weekly'
-            amount = 1
-            daysOfWeek = [1, 2, 3, 4, 5]
-        return es(typ, period=amount, daysOfWeek=daysOfWeek)
-
-    m = re.match(r'every!? (?P<day>mon|tue|wed|thu|fri|sat|sun|monday|'
-                 r'tuesday|wednesday|thursday|friday|saturday|sunday)'
-                 r'( (at )?\d\d:\d\d)?$', datestring)
-    if m:
-        daysOfWeek = []
-        day = m.group('day')
-        if day in ('mon', 'monday'):
-            daysOfWeek = [1]
-        elif day in ('tue', 'tuesday'):
-            daysOfWeek = [2]
-        elif day in ('wed', 'wednesday'):
-            daysOfWeek = [3]
-        elif day in ('thu', 'thursday'):
-            daysOfWeek = [4]
-        elif day in ('fri', 'friday'):
-            daysOfWeek = [5]
-        elif day in ('sat', 'saturday'):
-            daysOfWeek = [6]
-        elif day in ('sun', 'sunday'):
-            daysOfWeek = [7]
-        else:
-            raise Exception("Invalid day '{}' in: {}".format(day, datestring))
-        return es('Weekly', period=1, daysOfWeek=daysOfWeek)
-
-    # Too lazy to add more, and not any time left
-    raise Exception("Unhandled date_string: {}".format(datestring))
-
-
-def add_item(edo, api, item, list_type=None, parent=None,
+    if p['is_deleted']:
+        return None
+    eproject = everdo.Everdo_Project(
+            list_type, p['name'], is_focused=p['is_favorite'],
+            completed_on=get_completed_on(p), tags=[t for t in tags if t],
+            id=everdo.gen_uuid('project', p['id']))
+    edo.add_item(eproject, p)
+
+    for item in index.get_items(p):
+        if item['is_deleted']:
+            continue
+        if schedule and item['due_date_utc']:
+            # Move project to scheduled if any date is set
+            eproject.data['list'] = 's'
+            start_date = everdo.duedateutc2stamp(item['due_date_utc'])
+            if (not eproject.data['start_date'] or
+                    start_date < eproject.data['start_date']):
+                eproject.data['start_date'] = start_date
+        if item.is_title():
+            eproject.data['note'] += '\n' + item['content']
+            edo.todoist2everdo.setdefault(item['id'], eproject.data['id'])
+            continue
+        add_item(edo, index, item, parent=eproject)
+        if stats is not None:
+            stats[list_type + '_items'] += 1
+    return eproject
+
+
+def get_inactive_labels(index, item):
+    """Get the labels archived from the item, and remove their markers"""
+    item['content'] = index.archived_labels.strip(item['content'])
+    return index.archived_labels.get(item['id'])
+
+
+def add_item(edo, index, item, list_type=None, parent=None,
              everdo_cls=everdo.Everdo_Action):
     """Add an action/item/note (not project)"""
     completed_on = due_date = None
 
     if not list_type:
         list_type = 'a'
-        if item.is_waiting():
+        if (item.is_actionable() and
+                index.waiting_label in item.get_labels()):
             list_type = 'w'
 
     if item['is_archived'] or item['date_completed']:
@@ -218,13 +274,14 @@ def add_item(edo, api, item, list_type=None, parent=None,
     schedule = None
     if item['date_string']:
         try:
-            schedule = parse_datestring_to_schedule(item['date_string'])
-        except Exception:
+            schedule = dates.get_schedule(item['date_string'])
+        except exceptions.UnhandledDateError:
             print("WARN: Add schedule manually for {}. Datestring: {}"
                   .format(item['content'][:100], item['date_string']))
 
     tags = [edo.get_eid(l) for l in item['labels']]
-    tags.extend(edo.get_eid(l) for l in get_inactive_labels(item))
+    tags.extend(edo.get_eid(l) for l in get_inactive_labels(index, item)
+                if l not in item['labels'])
     ret = everdo_cls(parent,
                      list_type=list_type,
                      title=item['content'],
@@ -232,134 +289,59 @@ def add_item(edo, api, item, list_type=None, parent=None,
                      created_on=created_on,
                      due_date=due_date,
                      schedule=schedule,
-                     tags=tags)
+                     tags=tags,
+                     id=everdo.gen_uuid('item', item['id']))
     edo.add_item(ret, item)
     return ret
 
 
-def add_someday(edo, api):
-    added_projects = 0
-    added_items = 0
-    added_standalone_items = 0
-    for t in api.get_somedaymaybe():
-        for p in t.get_child_projects():
-            if p['is_deleted']:
-                continue
-            completed_on = None
-            if p['is_archived']:
-                completed_on = int(time.time())
-            eproject = everdo.Everdo_Project(
-                    'm', p['name'], is_focused=p['is_favorite'],
-                    completed_on=completed_on)
-            edo.add_item(eproject, p)
-            added_projects += 1
-
-            for item in p.get_child_items():
-                if item['is_deleted']:
-                    continue
-                if item['due_date_utc']:
-                    # Move project to scheduled if any date is set
-                    eproject.data['list'] = 's'
-                    start_date = everdo.duedateutc2stamp(item['due_date_utc'])
-                    if (not eproject.data['start_date'] or
-                            start_date < eproject.data['start_date']):
-                        eproject.data['start_date'] = start_date
-                if item.is_title():
-                    eproject.data['note'] += '\n' + item['content']
-                    edo.todoist2everdo.setdefault(item['id'],
-                                                  eproject.data['id'])
-                    continue
-                add_item(edo, api, item, parent=eproject)
-                added_items += 1
-
-        for item in t.get_child_items():
-            add_item(edo, api, item, parent=None, list_type='m')
-            added_standalone_items += 1
-
-    print("Added %d someday projects, with %d items" % (added_projects,
-                                                        added_items))
-    print("Added %d standalone someday items" % added_standalone_items)
-
-
-def add_other_project(edo, api, pname):
-    """Simply copy the project. Manual tweaks needed in Everdo afterwards."""
-    p = api.get_project_by_name(pname)
-    if p.get_child_projects():
-        print("WARN: {} has child projects. What to do?".format(pname))
-    if p['is_deleted']:
-        print("WARN: {} is deleted. What to do?".format(pname))
-        return
+def add_todoist_notes(edo, index, store=None, workers=4):
+    """Add the notes of the exported items.
 
-    completed_on = None
-    if p['is_archived']:
-        completed_on = int(time.time())
-    eproject = everdo.Everdo_Project('a', p['name'],
-                                     is_focused=p['is_favorite'],
-                                     completed_on=completed_on)
-    edo.add_item(eproject, p)
-
-    for item in p.get_child_items():
-        if item['is_deleted']:
-            continue
-        if item.is_title():
-            eproject.data['note'] += '\n' + item['content']
-            edo.todoist2everdo.setdefault(item['id'],
-                                          eproject.data['id'])
-            continue
-        add_item(edo, api, item, parent=eproject)
+    :type store: attachments.AttachmentStore
+    :param store:
+        If given, file attachments are downloaded into it, and the notes link
+        to the local files instead of Todoist.
 
-
-def add_notebook(edo, api, pname):
-    """Simply copy the project. Manual tweaks needed in Everdo afterwards."""
-    p = api.get_project_by_name(pname)
-    if p.get_child_projects():
-        print("WARN: {} has child projects. What to do?".format(pname))
-    if p['is_deleted']:
-        print("WARN: {} is deleted. What to do?".format(pname))
-        return
-
-    completed_on = None
-    if p['is_archived']:
-        completed_on = int(time.time())
-    notebook = everdo.Everdo_Notebook('a', p['name'],
-                                      is_focused=p['is_favorite'],
-                                      completed_on=completed_on)
-    edo.add_item(notebook, p)
-
-    for item in p.get_child_items():
-        if item['is_deleted']:
-            continue
-        add_item(edo, api, item, parent=notebook,
-                 everdo_cls=everdo.Everdo_Note)
-
-
-def add_todoist_notes(edo, api):
-    i = 0
-    for note in api.notes.all():
-        if note['is_deleted']:
-            continue
-        if note['is_archived']:
-            continue
-        if not note['content'].strip():
-            continue
+    """
+    i = skipped = 0
+    added = []
+    for item_id, notes in index.notes.iteritems():
         try:
-            eitem = edo.get_eitem(note['item_id'])
+            eitem = edo.get_eitem(item_id)
         except KeyError:
-            item = api.items.get_by_id(note['item_id'])
-            print("Can't find item id {} ({}) for note: {}"
-                  .format(note['item_id'],
-                          item['content'][:100].replace('\n', ' '),
-                          note['content'][:100].replace('\n', ' ')))
+            skipped += len(notes)
             continue
+        for note in notes:
+            if note['is_deleted']:
+                continue
+            if note['is_archived']:
+                continue
+            if not note['content'].strip():
+                continue
+            added.append((eitem, note))
+
+    paths = {}
+    if store is not None:
+        files = [n['file_attachment'] for _, n in added
+                 if attachments.get_file_url(n['file_attachment'])]
+        print("Downloading %d attachments…" % len(files))
+        paths = attachments.download_all(store, files, workers=workers)
+        print("Downloaded %d attachments" % len(paths))
+
+    for eitem, note in added:
         eitem.data['note'] += '\n' + note['content']
         i += 1
-        # Add file attachments as direct links. Should I download them instead?
+        # Add file attachments as links, to the local file if downloaded
         if note['file_attachment']:
             for k in ('file_url', 'url'):
                 url = note['file_attachment'].get(k)
                 if url:
-                    eitem.data['note'] += '\n' + url
+                    eitem.data['note'] += '\n' + paths.get(url, url)
     print("Added %d notes" % i)
+    if skipped:
+        print("WARN: Skipped %d notes for items that were not exported"
+              % skipped)
 
 
 def main():
@@ -367,8 +349,22 @@ def main():
             description="Export Todoist data to file for Everdo")
     # p.add_argument('--export-cache', type.
     # p.add_argument('--import-cache', type.
-    p.add_argument("out", default=sys.stdout, type=argparse.FileType('w'),
+    p.add_argument("out", default=sys.stdout, type=argparse.FileType('wb'),
                    help="JSON output file, for Everdo")
+    p.add_argument("--compact", action='store_true',
+                   help="Write the JSON without indentation and newlines")
+    p.add_argument("--gzip", action='store_true',
+                   help="Compress the output file with gzip")
+    p.add_argument("--manifest",
+                   help="File with the state of earlier exports. If given, "
+                   "only new and changed items and tags are exported, and "
+                   "the file is updated")
+    p.add_argument("--download-attachments", metavar='DIR',
+                   help="Download file attachments into given directory, "
+                   "and link to the local files. Files already downloaded "
+                   "are skipped.")
+    p.add_argument("--download-workers", type=int, default=4,
+                   help="Number of parallel downloads. Default: %(default)s")
     args = p.parse_args()
     api = TodoistGTD(configfiles=args.configfile, token=args.token)
     if not api.is_authenticated():
@@ -378,18 +374,36 @@ def main():
     print("Full sync done")
 
     edo = everdo.Everdo_File()
+    index = ExportIndex(api)
     add_tags(edo, api)
-    add_inbox(edo, api)
-    add_active_projects(edo, api)
-    add_someday(edo, api)
-    for p in ("JobbRutiner", "PrivatRutiner", "Husarbeid", "Påminningar"):
-        add_other_project(edo, api, p)
-    add_notebook(edo, api, "Lesestund")
-    add_todoist_notes(edo, api)
-
-    edo.export(args.out)
-    print("Exported %d items and %d tags" % (len(edo.items), len(edo.tags)))
+    add_projects(edo, index)
+    store = None
+    if args.download_attachments:
+        store = attachments.AttachmentStore(args.download_attachments)
+    add_todoist_notes(edo, index, store=store,
+                      workers=args.download_workers)
+
+    # Validate what gets written, which is less with a manifest
+    items, tags = edo.items, edo.tags
+    manifest = None
+    if args.manifest:
+        manifest = everdo.Everdo_Manifest(args.manifest)
+        items = list(manifest.filter_changed(items))
+        tags = list(manifest.filter_changed(tags))
+    problems = edo.validate(items, tags)
+    for problem in problems:
+        print("WARN: {}".format(problem))
+    if problems:
+        print("WARN: Found %d problems, Everdo might refuse the file"
+              % len(problems))
+
+    counts = edo.export(args.out, compact=args.compact, compress=args.gzip,
+                        items=items, tags=tags)
+    # Make sure the export is written before the manifest says so
     args.out.close()
+    if manifest is not None:
+        manifest.save()
+    print("Exported %d items and %d tags" % (counts['items'], counts['tags']))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,68 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Import an Everdo JSON file into Todoist.
+
+The opposite of `everdo_export.py`. The file is read one record at a time, and
+the changes are sent to Todoist in batches of `TodoistGTD.max_commands`.
+
+See https://forum.everdo.net/t/import-data-format/106/3 for data format.
+
+Mapping from Everdo:
+
+- Tags, of all types, become labels, with spaces replaced by underscores.
+  Existing labels with the same name are reused.
+
+- Projects and notebooks become top level projects. Todoist's sync API has no
+  parent ids for projects, so areas are only kept as labels on the items.
+
+- Actions and notes become items in their project, or in Inbox when they have
+  none. Someday items without a project go to the first Someday/Maybe project.
+  The Everdo note becomes a note on the item.
+
+- Items in the waiting list get the label @waiting, if it exists.
+
+- The due date, or the start date for scheduled items, becomes the item's
+  date. Repeating schedules are not imported.
+
+- Deleted and completed items and projects are skipped.
+
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+
+from todoist_gtd_utils import TodoistGTD
+from todoist_gtd_utils import everdo
+from todoist_gtd_utils import exceptions
+from todoist_gtd_utils import userinput
+
+
+def main():
+    p = userinput.get_argparser(
+            description="Import an Everdo JSON file into Todoist")
+    p.add_argument("infile", type=argparse.FileType('rb'),
+                   help="JSON file from Everdo, optionally gzip compressed")
+    args = p.parse_args()
+    api = TodoistGTD(configfiles=args.configfile, token=args.token)
+    if not api.is_authenticated():
+        userinput.login_dialog(api)
+    api.sync()
+
+    try:
+        importer = everdo.EverdoImporter(api)
+    except exceptions.NotFoundError as e:
+        print("Can't import: {}".format(e))
+        return
+    for kind, record in everdo.iter_everdo_file(args.infile):
+        importer.add(kind, record)
+    importer.finish()
+    args.infile.close()
+    for key, value in sorted(importer.stats.items()):
+        print("{}: {}".format(key.capitalize(), value))
+
+
+if __name__ == '__main__':
+    main()
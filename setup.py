@@ -58,6 +58,7 @@ setup(
         'bin/gtd_utils',
         'bin/gtd_shell',
         'bin/todoist_add_mail_item',
+        'bin/todoist_add_mail_batch',
         ],
     include_package_data=True,
     zip_safe=False,
@@ -26,23 +26,45 @@ TODO:
 from __future__ import unicode_literals
 
 import io
+import re
 import time
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from requests import HTTPError
 
-from termcolor import cprint, colored
+from termcolor import colored
 
 import todoist
 from todoist.api import SyncError
+from todoist.managers.items import ItemsManager
+from todoist.managers.labels import LabelsManager
+from todoist.managers.notes import NotesManager
+from todoist.managers.projects import ProjectsManager
 
 from . import config
+from . import dates
 from . import utils
 from . import userinput
 from . import exceptions
+from . import mail
+from . import output
+
+""" Marker in an item's content for a label archived from it, like __label """
+archived_label_pattern = re.compile(r'__(\w+)', re.UNICODE)
+
+""" Note added to an item when a label is archived from it. Contains the
+label's id, and then its name. """
+removed_label_pattern = re.compile(r'^gtd_(?:utils|clean):removed_labels?:'
+                                   r'([^:\s]+)')
 
 
 class TodoistGTD(todoist.api.TodoistAPI):
 
+    """ Max number of commands to send to Todoist in one request """
+    max_commands = 100
+
+    """ Max number of cached previews, before the cache is cleared """
+    max_previews = 5000
+
     def __init__(self, configfiles=None, **kwargs):
         self.config = config.Config()
         if configfiles:
@@ -50,6 +72,10 @@ class TodoistGTD(todoist.api.TodoistAPI):
         if not kwargs.get('token'):
             kwargs['token'] = self.config.get('todoist', 'api-token')
         super(TodoistGTD, self).__init__(**kwargs)
+        self.projects = GTDProjectsManager(self)
+        self.items = GTDItemsManager(self)
+        self.notes = GTDNotesManager(self)
+        self.labels = GTDLabelsManager(self)
 
         # Check if authenticated:
         if 'token' in kwargs:
@@ -89,6 +115,180 @@ class TodoistGTD(todoist.api.TodoistAPI):
         except ValueError:
             return response.text
 
+    def reset_state(self):
+        """Override to also reset the indexes of the state"""
+        super(TodoistGTD, self).reset_state()
+        # Index from mails' Message-Id to item ids. Built on first use.
+        self._message_ids = None
+        # Archived labels per item. Built on first use, reset by syncs.
+        self._archived_labels = None
+        # Patterns for finding @labels and #projects in text, by kind
+        self._name_patterns = {}
+        # Rendered previews, by object id and style
+        self._previews = {}
+        # Projects named in the config, by option and config version
+        self._config_projects = {}
+        # Ids of hibernated and active projects, by config version
+        self._project_sets = None
+
+    def _update_state(self, syncdata):
+        """Override to keep indexes updated with changes from Todoist"""
+        super(TodoistGTD, self)._update_state(syncdata)
+        if any(k in syncdata for k in ('labels', 'items', 'notes')):
+            self._archived_labels = None
+        for kind in ('labels', 'projects'):
+            if kind in syncdata:
+                self._name_patterns.pop(kind, None)
+        if syncdata.get('projects'):
+            self._config_projects = {}
+            self._project_sets = None
+        if syncdata.get('temp_id_mapping'):
+            # New projects have got their real ids
+            self._project_sets = None
+        if syncdata.get('labels') or syncdata.get('projects'):
+            # Label and project names are in the previews of items
+            self._previews = {}
+        elif syncdata.get('items'):
+            changed = set(i['id'] for i in syncdata['items'])
+            self._previews = dict((k, v) for k, v in
+                                  self._previews.iteritems()
+                                  if k[0] not in changed)
+        if 'notes' in syncdata:
+            for note in syncdata['notes']:
+                self._index_note(note)
+
+    def _index_note(self, note):
+        """Update the indexes with a given note.
+
+        :type note: dict or todoist.models.Note
+
+        """
+        if self._message_ids is None:
+            return
+        data = getattr(note, 'data', note)
+        for message_id in mail.get_message_ids(data.get('content') or ''):
+            if not data.get('is_deleted'):
+                self._message_ids[message_id] = data['item_id']
+            elif self._message_ids.get(message_id) == data['item_id']:
+                del self._message_ids[message_id]
+
+    def get_message_id_index(self):
+        """Get the index from mails' Message-Id to the items' id.
+
+        The index is built from the notes the first time, and is then kept
+        updated by syncs and new notes.
+
+        :rtype: dict
+
+        """
+        if self._message_ids is None:
+            self._message_ids = {}
+            for note in self.notes.all():
+                self._index_note(note)
+        return self._message_ids
+
+    def get_item_by_message_id(self, message_id):
+        """Return the item created from the mail with the given Message-Id.
+
+        Items created from mails has the mail's headers in a note.
+
+        :rtype: HumanItem or None
+
+        """
+        if not message_id:
+            return None
+        item_id = self.get_message_id_index().get(message_id.strip())
+        if item_id is None:
+            return None
+        return self.items.get_by_id(item_id, only_local=True)
+
+    def get_name_pattern(self, kind):
+        """Get a pattern for finding all labels or projects in text.
+
+        Labels are written as @name and projects as #name, like in Todoist's
+        quick add. All names are in one compiled alternation, longest first,
+        so multi-word names are found, and text is scanned only once. The
+        names must be separate tokens, e.g. not part of a mail address.
+
+        The pattern is cached until the next sync with changes to the labels
+        or projects, or until they are added, renamed or removed locally.
+
+        :type kind: str
+        :param kind: "labels" or "projects"
+
+        :rtype: tuple
+        :return:
+            The compiled pattern, with the name in the first group, and a dict
+            with the objects by their lowercased name. The pattern is None if
+            there are no names.
+
+        """
+        count = len(self.state[kind])
+        cached = self._name_patterns.get(kind)
+        if cached is None or cached[0] != count:
+            objects = {}
+            for obj in getattr(self, kind).all():
+                if obj.data.get('is_deleted'):
+                    continue
+                objects.setdefault(obj['name'].strip().lower(), obj)
+            names = sorted(objects, key=len, reverse=True)
+            pattern = None
+            if names:
+                sigil = '@' if kind == 'labels' else '#'
+                regex = (r'(?<!\S)' + sigil + '(' +
+                         '|'.join(map(re.escape, names)) + ')' +
+                         # The name must end the token
+                         r'(?=[\s,.;:!?)]|$)')
+                pattern = re.compile(regex, re.IGNORECASE | re.UNICODE)
+            cached = self._name_patterns[kind] = (count, pattern, objects)
+        return cached[1], cached[2]
+
+    def get_preview(self, obj, style, render):
+        """Return a rendered preview of an object, cached until it changes.
+
+        The cache is checked against the object's preview version and the
+        terminal width, and changed objects are removed from it by syncs. It
+        is cleared when projects or labels are renamed, and when it has
+        `max_previews` entries.
+
+        :type obj: HumanItem or HelperProject
+        :param obj: The object to render.
+
+        :type style: unicode
+        :param style: Name of the preview, unique for each kind of object.
+
+        :type render: callable
+        :param render: Renders the preview, if not cached.
+
+        :rtype: unicode
+
+        """
+        key = (obj['id'], style)
+        version = (obj.get_preview_version(),
+                   userinput.get_terminal_size()[1])
+        cached = self._previews.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        ret = render()
+        if key not in self._previews and len(self._previews) >= \
+                self.max_previews:
+            # Drops entries of deleted objects and replaced temp ids too
+            self._previews = {}
+        self._previews[key] = (version, ret)
+        return ret
+
+    def get_archived_labels(self):
+        """Get the labels that are archived from items.
+
+        Parsed once, and then cached until the next sync.
+
+        :rtype: ArchivedLabels
+
+        """
+        if self._archived_labels is None:
+            self._archived_labels = ArchivedLabels(self)
+        return self._archived_labels
+
     def is_authenticated(self):
         """Return is user is authenticated.
 
@@ -178,6 +378,33 @@ class TodoistGTD(todoist.api.TodoistAPI):
         name = name.strip()
         return self.projects.all(lambda p: p['name'].strip() == name)
 
+    def get_project_children(self):
+        """Get the project tree, in one pass over all projects.
+
+        The tree is given by the item_order and indent of the projects, like
+        in `HelperProject.get_child_projects`.
+
+        :rtype: dict
+        :return:
+            The direct child projects of each project, by the parent's id,
+            sorted by their order. The top level projects are under the key
+            None.
+
+        """
+        children = {None: []}
+        # The current line of ancestors, as (indent, project id)
+        stack = []
+        projects = sorted(self.projects.all(),
+                          key=lambda p: p.data.get('item_order', 0))
+        for p in projects:
+            indent = p.data.get('indent', 1)
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            parent_id = stack[-1][1] if stack else None
+            children.setdefault(parent_id, []).append(p)
+            stack.append((indent, p['id']))
+        return children
+
     def force_commit(self):
         """Make sure a commit with Todoist is commited.
 
@@ -215,6 +442,25 @@ class TodoistGTD(todoist.api.TodoistAPI):
             else:
                 return True
 
+    def commit_when_full(self, margin=0):
+        """Commit the queue if it would not fit in one request anymore.
+
+        Used when batching many changes, to send them in as few requests as
+        possible.
+
+        :type margin: int
+        :param margin:
+            The number of commands that are about to be added. Useful for
+            keeping related commands, e.g. with temp ids, in the same request.
+
+        :rtype: bool
+        :return: True if the queue was committed.
+
+        """
+        if len(self.queue) + margin > self.max_commands:
+            return self.force_commit()
+        return False
+
     def fullsync(self):
         """Force a fullsync, since `sync()` fails sometimes.
 
@@ -237,6 +483,65 @@ class TodoistGTD(todoist.api.TodoistAPI):
         files = {'file': filedata}
         return self._post('uploads/add', data=data, files=files)
 
+    def get_config_projects(self, option):
+        """Get the projects named in a config option in the gtd section.
+
+        The names are looked up once, and the projects are reused until the
+        config changes or projects are synced.
+
+        :raise NotFoundError: If a project is not found.
+
+        :rtype: list
+
+        """
+        key = (option, self.config.version)
+        ret = self._config_projects.get(key)
+        if ret is None:
+            names = self.config.get_commalist('gtd', option)
+            ret = map(self.get_project_by_name, names)
+            self._config_projects[key] = ret
+        return list(ret)
+
+    def get_project_sets(self):
+        """Get the ids of the hibernated and the active projects.
+
+        The hibernated projects are the Someday/Maybe projects and all their
+        descendants, and the active are the target projects and all their
+        descendants. Kept until the config changes, projects are synced or
+        the project tree is changed locally.
+
+        :rtype: tuple
+        :return: Two frozensets, with the hibernated and the active ids.
+
+        """
+        if (self._project_sets is not None and
+                self._project_sets[0] == self.config.version):
+            return self._project_sets[1]
+        children = self.get_project_children()
+
+        def get_subtree_ids(roots):
+            ret = set()
+            stack = list(roots)
+            while stack:
+                p = stack.pop()
+                if p['id'] not in ret:
+                    ret.add(p['id'])
+                    stack.extend(children.get(p['id'], ()))
+            return frozenset(ret)
+
+        sets = (get_subtree_ids(self.get_somedaymaybe()),
+                get_subtree_ids(self.get_targetprojects()))
+        self._project_sets = (self.config.version, sets)
+        return sets
+
+    def get_hibernated_ids(self):
+        """Get the ids of the Someday/Maybe projects and their descendants"""
+        return self.get_project_sets()[0]
+
+    def get_active_ids(self):
+        """Get the ids of the target projects and their descendants"""
+        return self.get_project_sets()[1]
+
     def get_somedaymaybe(self):
         """Get list with all Someday/Maybe projects.
 
@@ -244,8 +549,7 @@ class TodoistGTD(todoist.api.TodoistAPI):
         :return: A list with project objects.
 
         """
-        pr_names = self.config.get_commalist('gtd', 'someday-projects')
-        return map(self.get_project_by_name, pr_names)
+        return self.get_config_projects('someday-projects')
 
     def get_targetprojects(self):
         """Get list with all *target* projects.
@@ -256,13 +560,186 @@ class TodoistGTD(todoist.api.TodoistAPI):
         :return: A list with project objects.
 
         """
-        pr_names = self.config.get_commalist('gtd', 'target-projects')
-        return map(self.get_project_by_name, pr_names)
+        return self.get_config_projects('target-projects')
+
+
+class GTDProjectsManager(ProjectsManager):
+    """Projects manager that resets the configured projects and the project
+    sets when projects or the tree change, and the name pattern when the
+    names change"""
+
+    def reset_project_caches(self):
+        """Reset the projects resolved from the config, and the project sets
+        built from them"""
+        self.api._config_projects = {}
+        self.api._project_sets = None
+
+    def add(self, name, **kwargs):
+        self.reset_project_caches()
+        self.api._name_patterns.pop('projects', None)
+        return super(GTDProjectsManager, self).add(name, **kwargs)
+
+    def update(self, project_id, **kwargs):
+        if any(k in kwargs for k in ('indent', 'item_order', 'name')):
+            self.reset_project_caches()
+        if 'name' in kwargs:
+            self.api._name_patterns.pop('projects', None)
+            # Project names are in the previews of items
+            self.api._previews = {}
+        super(GTDProjectsManager, self).update(project_id, **kwargs)
+
+    def delete(self, project_ids):
+        self.reset_project_caches()
+        self.api._name_patterns.pop('projects', None)
+        super(GTDProjectsManager, self).delete(project_ids)
+
+    def archive(self, project_id):
+        self.reset_project_caches()
+        super(GTDProjectsManager, self).archive(project_id)
+
+    def unarchive(self, project_id):
+        self.reset_project_caches()
+        super(GTDProjectsManager, self).unarchive(project_id)
+
+    def update_orders_indents(self, ids_to_orders_indents):
+        self.reset_project_caches()
+        super(GTDProjectsManager, self).update_orders_indents(
+                                                    ids_to_orders_indents)
+
+
+class GTDLabelsManager(LabelsManager):
+    """Labels manager that resets the name pattern when the names change"""
+
+    def add(self, name, **kwargs):
+        self.api._name_patterns.pop('labels', None)
+        return super(GTDLabelsManager, self).add(name, **kwargs)
+
+    def update(self, label_id, **kwargs):
+        if 'name' in kwargs:
+            self.api._name_patterns.pop('labels', None)
+            # Label names are in the previews of items
+            self.api._previews = {}
+        super(GTDLabelsManager, self).update(label_id, **kwargs)
+
+    def delete(self, label_id):
+        self.api._name_patterns.pop('labels', None)
+        super(GTDLabelsManager, self).delete(label_id)
+
+
+class GTDItemsManager(ItemsManager):
+    """Items manager that sets the due date of new dates locally.
+
+    Todoist sets `due_date_utc` from the `date_string` when synced. It is set
+    locally as well, to have correct due dates before the next sync. Dates
+    that can't be resolved locally leave the due date as it is.
+
+    """
+
+    def set_due_date(self, item, date_string):
+        """Set the item's `due_date_utc` from a date string, if resolved"""
+        due = dates.get_due_date_utc(date_string)
+        if due is not None or dates.is_no_date(date_string):
+            item.data['due_date_utc'] = due
+
+    def add(self, content, project_id, **kwargs):
+        obj = super(GTDItemsManager, self).add(content, project_id, **kwargs)
+        if 'date_string' in kwargs and 'due_date_utc' not in kwargs:
+            self.set_due_date(obj, kwargs['date_string'])
+        return obj
+
+    def update(self, item_id, **kwargs):
+        super(GTDItemsManager, self).update(item_id, **kwargs)
+        if 'date_string' in kwargs and 'due_date_utc' not in kwargs:
+            item = self.get_by_id(item_id, only_local=True)
+            if item is not None:
+                self.set_due_date(item, kwargs['date_string'])
+
+
+class GTDNotesManager(NotesManager):
+    """Notes manager that keeps the API's indexes updated with new notes"""
+
+    def add(self, item_id, content, **kwargs):
+        obj = super(GTDNotesManager, self).add(item_id, content, **kwargs)
+        self.api._index_note(obj)
+        return obj
+
+
+class ArchivedLabels(object):
+    """Labels archived from items, e.g. for projects put in Someday/Maybe.
+
+    A label is archived from an item by removing the label and adding a
+    `__labelname` marker to its content, and a note with the label's id. See
+    `remove_labels_in_someday` in gtd_review. Both are parsed here, in one
+    pass over the items and notes.
+
+    """
+    def __init__(self, api):
+        # Label ids, by lowercased label name
+        self.label_ids = dict((l['name'].lower(), l['id'])
+                              for l in api.labels.all()
+                              if not l.data.get('is_deleted'))
+        # Existing label ids, by their string value as used in the notes
+        existing = dict((unicode(l), l) for l in self.label_ids.itervalues())
+        # Ids of archived labels, by the item's id
+        self.labels = {}
+        # Notes about removed labels, by the item's id
+        self.notes = {}
+
+        for item in api.items.all():
+            for l in self.get_label_ids(item['content']):
+                self.labels.setdefault(item['id'], set()).add(l)
+        for note in api.notes.all():
+            if note.data.get('is_deleted'):
+                continue
+            m = removed_label_pattern.match(note['content'] or '')
+            if not m:
+                continue
+            self.notes.setdefault(note['item_id'], []).append(note)
+            l = existing.get(m.group(1))
+            if l is not None:
+                self.labels.setdefault(note['item_id'], set()).add(l)
+
+    def get_label_ids(self, content):
+        """Get the ids of the existing labels marked in given content."""
+        ret = set()
+        for name in archived_label_pattern.findall(content or ''):
+            l = self.label_ids.get(name.lower())
+            if l is not None:
+                ret.add(l)
+        return ret
+
+    def get(self, item_id):
+        """Get the ids of the labels archived from an item.
+
+        :rtype: set
+
+        """
+        return self.labels.get(item_id, set())
+
+    def strip(self, content, label_ids=None):
+        """Remove the markers of archived labels from content.
+
+        :type label_ids: set
+        :param label_ids:
+            Only remove the markers of these labels. Default is to remove the
+            markers of all existing labels.
+
+        """
+        def replace(m):
+            l = self.label_ids.get(m.group(1).lower())
+            if l is None or (label_ids is not None and l not in label_ids):
+                return m.group(0)
+            return ''
+        return archived_label_pattern.sub(replace, content).strip()
 
 
 class HelperProject(todoist.models.Project):
     """Helper methods for project"""
 
+    """ Fields the previews of a project are made from """
+    preview_fields = ('name', 'indent', 'is_deleted', 'is_archived',
+                      'has_more_notes')
+
     def get_parent_project(self):
         """Return the project's parent project.
 
@@ -341,31 +818,37 @@ class HelperProject(todoist.models.Project):
         Uses a few lines, and colors!
 
         """
-        print(self.get_short_preview())
-        print(self.get_url())
-        print("")
+        out = output.Writer()
+        out.line(self.get_short_preview())
+        out.line(self.get_url())
+        out.line()
         try:
-            print("Parent project: {}".format(self.get_parent_project()))
+            out.line("Parent project: {}".format(self.get_parent_project()))
         except IndexError:
             pass
         children = self.get_child_projects()
         if children:
-            print("\nChild project:")
+            out.line("\nChild project:")
             for child in children:
-                print(child)
+                out.line(unicode(child))
 
-        cprint('\nItems:', attrs=['bold'])
+        out.line('\nItems:', attrs=['bold'])
         items = self.get_child_items()
         if not items:
-            print("(found no items)")
+            out.line("(found no items)")
         for item in sorted(items, key=lambda x: x.data.get('item_order', 999)):
-            print("{:>2} {}".format(item.data.get('item_order', 999), item))
+            out.line("{:>2} {}".format(item.data.get('item_order', 999), item))
 
         notes = self.get_notes()
         if notes:
-            print("\nProject notes:")
+            out.line("\nProject notes:")
             for note in notes:
-                print(note)
+                out.line(unicode(note))
+        out.flush()
+
+    def get_preview_version(self):
+        """Return the data the previews of the project are made from"""
+        return tuple(self.data.get(f) for f in self.preview_fields)
 
     def get_short_preview(self):
         """Get one line with details of the project.
@@ -374,6 +857,10 @@ class HelperProject(todoist.models.Project):
         shortened in small terminal windows.
 
         """
+        return self.api.get_preview(self, 'project-short',
+                                    self.render_short_preview)
+
+    def render_short_preview(self):
         max = userinput.get_terminal_size()[1]
         pre = []
         if self['indent'] > 1:
@@ -440,9 +927,7 @@ class GTDProject(HelperProject):
 
         """
         if not parent_project:
-            parent_project = self.config.get_commalist('gtd',
-                                                       'target-projects')[0]
-            parent_project = self.api.get_project_by_name(parent_project)
+            parent_project = self.api.get_targetprojects()[0]
         if isinstance(parent_project, int):
             parent_project = self.api.projects.get_by_id(parent_project)
         self.move_project(parent_project)
@@ -451,18 +936,22 @@ class GTDProject(HelperProject):
     def is_hibernated(self):
         """Check if project is hibernated.
 
+        That is, a Someday/Maybe project or one of their descendants.
+
         :rtype: bool
 
         """
-        parent = self.get_parent_project()
-        hibernates = self.api.get_somedaymaybe()
-        if self in hibernates or parent in hibernates:
-            return True
-        for p in hibernates:
-            children = p.get_child_projects()
-            if self in children or parent in children:
-                return True
-        return False
+        return self['id'] in self.api.get_hibernated_ids()
+
+    def is_active(self):
+        """Check if project is active.
+
+        That is, a target project or one of their descendants.
+
+        :rtype: bool
+
+        """
+        return self['id'] in self.api.get_active_ids()
 
     def hibernate(self, someday_project=None, reactivate_date=None):
         """Move project to Someday/Maybe.
@@ -584,9 +1073,7 @@ class GTDItem(HelperItem):
 
         """
         if not parent_project:
-            parent_project = self.config.get_commalist('gtd',
-                                                       'target-projects')[0]
-            parent_project = self.api.get_project_by_name(parent_project)
+            parent_project = self.api.get_targetprojects()[0]
         if isinstance(parent_project, int):
             parent_project = self.api.projects.get_by_id(parent_project)
         self.move_to_project(parent_project)
@@ -600,8 +1087,7 @@ class GTDItem(HelperItem):
 
         """
         if not someday_project:
-            hibernate = self.config.get_commalist('gtd', 'someday-projects')[0]
-            someday_project = self.get_project_by_name(hibernate)
+            someday_project = self.api.get_somedaymaybe()[0]
         # TODO: validate if given someday project is according to hibernated
         # from config?
         self.move_to_project(someday_project)
@@ -611,6 +1097,22 @@ class GTDItem(HelperItem):
 class HumanItem(GTDItem):
     """Simpler representation of a todoist item (task)."""
 
+    """ Fields the previews of an item are made from """
+    preview_fields = ('content', 'is_deleted', 'is_archived', 'due_date_utc',
+                      'date_string', 'priority', 'labels', 'project_id')
+
+    def get_preview_version(self):
+        """Return the data the previews of the item are made from.
+
+        Includes today's date, since overdue items are shown differently.
+
+        """
+        values = []
+        for f in self.preview_fields:
+            v = self.data.get(f)
+            values.append(tuple(v) if isinstance(v, list) else v)
+        return tuple(values), date.today()
+
     def get_frontend_pri(self):
         """Return priority in frontend's perspective.
 
@@ -627,6 +1129,10 @@ class HumanItem(GTDItem):
         Uses a few lines, and colors!
 
         """
+        return self.api.get_preview(self, 'item-presentation',
+                                    self.render_presentation)
+
+    def render_presentation(self):
         max = userinput.get_terminal_size()[1]
         ret = []
         # TODO: make content bold?
@@ -655,13 +1161,16 @@ class HumanItem(GTDItem):
         Uses a few lines, and colors!
 
         """
+        out = output.Writer()
         for n, note in enumerate(self.api.notes.all(lambda x: x['item_id'] ==
                                                     self['id'])):
-            cprint("Note {}, from {}:".format(n + 1, note.data.get('posted')),
-                   on_color='on_grey', color='blue')
-            cprint(utils.trim_too_long(note.data.get('content'), 2000),
-                   attrs=['dark'])
-            print('')
+            out.line("Note {}, from {}:".format(n + 1,
+                                                note.data.get('posted')),
+                     on_color='on_grey', color='blue')
+            out.line(utils.trim_too_long(note.data.get('content'), 2000),
+                     attrs=['dark'])
+            out.line()
+        out.flush()
 
     def get_short_preview(self, oneliner=True):
         """Get summary of the item.
@@ -670,6 +1179,11 @@ class HumanItem(GTDItem):
             If True, the output is cut to fit inside a terminal line.
 
         """
+        style = 'item-oneliner' if oneliner else 'item-short'
+        return self.api.get_preview(
+                self, style, lambda: self.render_short_preview(oneliner))
+
+    def render_short_preview(self, oneliner=True):
         ret = []
         if self.data.get('is_deleted'):
             ret.append('DELETED:')
@@ -0,0 +1,227 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Downloading of file attachments from Todoist.
+
+Files are downloaded in parallel, into a local store where each file is put
+in a directory named by the SHA-1 of its content. An index, by the
+attachment's URL, makes it possible to resume an aborted download, and to skip
+files that are already downloaded in later runs. Example on layout::
+
+    store/
+        index.json
+        0b/0b4f0e3c.../report.pdf
+        9a/9a1c7d22.../photo.jpg
+
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from multiprocessing.pool import ThreadPool
+
+import requests
+
+""" Bytes to read at a time when downloading """
+chunk_size = 64 * 1024
+
+
+def get_file_url(attachment):
+    """Return the URL of an uploaded file, or None if not a file.
+
+    :type attachment: dict
+    :param attachment: The `file_attachment` of a Todoist note.
+
+    """
+    if not attachment:
+        return None
+    return attachment.get('file_url')
+
+
+class AttachmentStore(object):
+    """Content addressed store of downloaded attachments."""
+
+    index_filename = 'index.json'
+
+    def __init__(self, directory, session=None):
+        """
+        :type directory: str
+        :param directory:
+            Where to put the files. Created if missing. Kept as an absolute
+            path, so the paths of the files still work from other
+            directories, e.g. when written in notes and exports.
+
+        :type session: requests.Session
+        :param session:
+            Session to download with. Default is a new session per thread,
+            since sessions are not guaranteed to be thread safe.
+
+        """
+        self.directory = directory = os.path.abspath(directory)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.session = session
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Info about the downloaded files, by their URL
+        self.index = {}
+        filename = os.path.join(directory, self.index_filename)
+        if os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                self.index = json.load(f)
+
+    def save(self):
+        """Write the index, replacing the old one in one operation."""
+        filename = os.path.join(self.directory, self.index_filename)
+        with self._lock:
+            raw = json.dumps(self.index, indent=0, sort_keys=True)
+        fd, tmpname = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(raw)
+        os.rename(tmpname, filename)
+
+    def get_session(self):
+        if self.session is not None:
+            return self.session
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def get_path(self, url):
+        """Return the local path of a downloaded file, or None."""
+        info = self.index.get(url)
+        if not info:
+            return None
+        path = os.path.join(self.directory, info['path'])
+        if not os.path.exists(path):
+            return None
+        return path
+
+    def is_fetched(self, url, size=None):
+        """Tell if the file is downloaded, and has the expected size."""
+        path = self.get_path(url)
+        if not path:
+            return False
+        if size is not None and os.path.getsize(path) != size:
+            return False
+        return True
+
+    def fetch(self, attachment):
+        """Download an attachment, unless already in the store.
+
+        Files with a known size are skipped without contacting the server if
+        the stored file has that size. Otherwise, the server is asked with the
+        stored ETag, and the download is skipped if not modified.
+
+        :type attachment: dict
+        :param attachment: The `file_attachment` of a Todoist note.
+
+        :rtype: str
+        :return: The local path of the file.
+
+        """
+        url = get_file_url(attachment)
+        size = attachment.get('file_size')
+        headers = {}
+        if self.is_fetched(url, size):
+            etag = self.index[url].get('etag')
+            if size is not None or not etag:
+                return self.get_path(url)
+            headers['If-None-Match'] = etag
+        response = self.get_session().get(url, headers=headers, stream=True)
+        if response.status_code == 304:
+            response.close()
+            return self.get_path(url)
+        response.raise_for_status()
+
+        # Download to a temporary file first, since the content decides its
+        # place in the store
+        checksum = hashlib.sha1()
+        fd, tmpname = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size):
+                    checksum.update(chunk)
+                    f.write(chunk)
+            digest = checksum.hexdigest()
+            filename = os.path.basename(attachment.get('file_name') or
+                                        'attachment') or 'attachment'
+            path = os.path.join(digest[:2], digest, filename)
+            fullpath = os.path.join(self.directory, path)
+            if not os.path.isdir(os.path.dirname(fullpath)):
+                try:
+                    os.makedirs(os.path.dirname(fullpath))
+                except OSError:
+                    # Another thread downloaded the same content
+                    pass
+            os.rename(tmpname, fullpath)
+        except Exception:
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+            raise
+        finally:
+            response.close()
+
+        with self._lock:
+            self.index[url] = {'path': path,
+                               'sha1': digest,
+                               'size': os.path.getsize(fullpath),
+                               'etag': response.headers.get('ETag'),
+                               }
+        return fullpath
+
+
+def download_all(store, attachments, workers=4, save_every=50):
+    """Download attachments in parallel.
+
+    Failed downloads are reported, but do not stop the rest.
+
+    :type store: AttachmentStore
+
+    :type attachments: list of dict
+    :param attachments: The `file_attachment` of Todoist notes.
+
+    :type workers: int
+    :param workers: Max number of parallel downloads.
+
+    :type save_every: int
+    :param save_every:
+        Save the index after this many downloads, to be able to resume.
+
+    :rtype: dict
+    :return: The local path of the downloaded files, by their URL.
+
+    """
+    unique = {}
+    for a in attachments:
+        url = get_file_url(a)
+        if url:
+            unique.setdefault(url, a)
+
+    def fetch(attachment):
+        url = get_file_url(attachment)
+        try:
+            return url, store.fetch(attachment)
+        except Exception as e:
+            print("WARN: Could not download {}: {}".format(url, e))
+            return url, None
+
+    ret = {}
+    pool = ThreadPool(max(1, workers))
+    try:
+        for i, (url, path) in enumerate(
+                pool.imap_unordered(fetch, unique.values()), 1):
+            if path:
+                ret[url] = path
+            if i % save_every == 0:
+                store.save()
+    finally:
+        pool.close()
+        pool.join()
+        store.save()
+    return ret
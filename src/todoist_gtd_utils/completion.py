@@ -0,0 +1,193 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+"""Tab completion and searching of choices.
+
+For tab completion, the choices are sorted once per choice set, and the
+prefix matches are found by binary search. Matches are cached per text, since
+readline asks for them once per candidate. If nothing starts with the text,
+choices containing it are suggested, and at last choices containing its
+characters in the same order ("fuzzy" matching).
+
+For searching, `Matcher` ranks the choices by how well they match, using an
+index of the trigrams in the choices to find candidates.
+
+"""
+
+from __future__ import unicode_literals
+
+import bisect
+import re
+
+""" Max number of choice sets to keep completers and matchers for """
+max_cached_completers = 20
+
+_completers = {}
+
+""" Ranks of a match, best first """
+EXACT, PREFIX, WORD, SUBSTRING, SUBSEQUENCE = range(5)
+
+
+class Completer(object):
+    """Find completions of text from a fixed set of choices."""
+
+    def __init__(self, choices):
+        self.choices = sorted(set(choices))
+        self.lowered = [c.lower() for c in self.choices]
+        # Matches, by the text to complete
+        self._cache = {}
+
+    def get_prefix_matches(self, text):
+        """Return the choices starting with text, in sorted order"""
+        start = bisect.bisect_left(self.choices, text)
+        ret = []
+        for choice in self.choices[start:]:
+            if not choice.startswith(text):
+                break
+            ret.append(choice)
+        return ret
+
+    def get_substring_matches(self, text):
+        """Return the choices containing text, ignoring case"""
+        text = text.lower()
+        return [c for c, l in zip(self.choices, self.lowered) if text in l]
+
+    def get_fuzzy_matches(self, text):
+        """Return the choices containing the chars of text, in order"""
+        regex = re.compile('.*?'.join(re.escape(c) for c in text.lower()))
+        return [c for c, l in zip(self.choices, self.lowered)
+                if regex.search(l)]
+
+    def get_matches(self, text):
+        """Return the completions of text.
+
+        :rtype: list
+        :return:
+            The choices starting with text. If none, the ones containing text,
+            or else the ones fuzzy matching text.
+
+        """
+        try:
+            return self._cache[text]
+        except KeyError:
+            pass
+        matches = self.get_prefix_matches(text)
+        if not matches and text:
+            matches = (self.get_substring_matches(text) or
+                       self.get_fuzzy_matches(text))
+        self._cache[text] = matches
+        return matches
+
+    def complete(self, text, state):
+        """The completer function for `readline.set_completer`"""
+        matches = self.get_matches(text)
+        if state < len(matches):
+            return matches[state]
+        return None
+
+
+class Matcher(object):
+    """Ranked search in a fixed set of choices, ignoring case.
+
+    Matches are ranked as exact, prefix, at the start of a word, anywhere as a
+    substring, and at last as a subsequence, with the characters in the same
+    order. Within a rank, shorter choices come first. Subsequences are only
+    searched for when nothing contains the text.
+
+    """
+
+    def __init__(self, choices):
+        self.choices = sorted(set(choices))
+        self.lowered = [c.lower() for c in self.choices]
+        # Index of the choices, by the trigrams in them
+        self.trigrams = {}
+        for i, l in enumerate(self.lowered):
+            for j in xrange(len(l) - 2):
+                self.trigrams.setdefault(l[j:j + 3], set()).add(i)
+
+    def get_candidates(self, text):
+        """Return indexes of the choices that could contain text"""
+        if len(text) < 3:
+            return xrange(len(self.choices))
+        ret = None
+        for j in xrange(len(text) - 2):
+            found = self.trigrams.get(text[j:j + 3])
+            if not found:
+                return ()
+            ret = found if ret is None else ret & found
+        return sorted(ret)
+
+    def rank(self, text, i):
+        """Return the rank of the choice with index i, or None"""
+        l = self.lowered[i]
+        pos = l.find(text)
+        if pos == -1:
+            return None
+        if l == text:
+            return EXACT
+        if pos == 0:
+            return PREFIX
+        while pos != -1:
+            if not l[pos - 1].isalnum():
+                return WORD
+            pos = l.find(text, pos + 1)
+        return SUBSTRING
+
+    def search(self, text, limit=None):
+        """Return the choices matching text, best match first.
+
+        :type limit: int
+        :param limit: Max number of matches to return.
+
+        :rtype: list
+
+        """
+        text = text.strip().lower()
+        if not text:
+            return []
+        ranked = []
+        for i in self.get_candidates(text):
+            r = self.rank(text, i)
+            if r is not None:
+                ranked.append((r, len(self.choices[i]), self.choices[i]))
+        if not ranked:
+            regex = re.compile('.*?'.join(re.escape(c) for c in text))
+            ranked = [(SUBSEQUENCE, len(c), c)
+                      for c, l in zip(self.choices, self.lowered)
+                      if regex.search(l)]
+        ranked.sort()
+        return [c for _, _, c in ranked[:limit]]
+
+
+def _get_cached(cls, choices):
+    key = (cls, frozenset(choices))
+    ret = _completers.get(key)
+    if ret is None:
+        if len(_completers) >= max_cached_completers:
+            _completers.clear()
+        ret = _completers[key] = cls(key[1])
+    return ret
+
+
+def get_completer(choices):
+    """Return a completer for given choices, reused for the same choices.
+
+    :type choices: list, tuple or dict
+    :param choices: If a dict, only its keys are used.
+
+    :rtype: Completer
+
+    """
+    return _get_cached(Completer, choices)
+
+
+def get_matcher(choices):
+    """Return a matcher for given choices, reused for the same choices.
+
+    :type choices: list, tuple or dict
+    :param choices: If a dict, only its keys are used.
+
+    :rtype: Matcher
+
+    """
+    return _get_cached(Matcher, choices)
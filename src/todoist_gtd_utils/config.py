@@ -13,9 +13,12 @@ from __future__ import unicode_literals
 
 import sys
 import os
+import collections
 # import codecs
 import ConfigParser
 
+from . import exceptions
+
 """ Default files to get config from """
 default_files = [u'~/.todoist_gtd_utils.ini']
 
@@ -27,22 +30,43 @@ default_settings = {
         'gtd': {
             'target-projects': "GTD",
             'activate-before-due-date': 0,
-            'someday-projects': ['Someday Maybe'],
+            'someday-projects': "Someday Maybe",
             },
         'cleanup': {
             'ignore-labels': None,
             },
+        # Quick add text for mails processed in batch, by matching headers.
+        # Format: `<header> <text in header> = <quick add text>`, e.g.:
+        #
+        #   from boss@example.com = #Work @office !!2
+        #
+        # The option `default` is added to all mails.
+        'mail-rules': {
+            'default': None,
+            },
         }
 
 
+""" The GTD settings, parsed. See `Config.get_gtd_settings`. """
+GTDSettings = collections.namedtuple('GTDSettings', (
+    'target_projects', 'someday_projects', 'activate_before_due_date',
+    'ignore_labels'))
+
+
 class Config(ConfigParser.ConfigParser, object):
     """ Config settings for todoist_gtd_utils.
 
     Set default values.
 
+    Parsed values are cached until the config is changed. The `version` is
+    increased for every change, for others to know when to update what they
+    have derived from the config.
+
     """
 
     def __init__(self, *args, **kwargs):
+        self.version = 0
+        self._parsed = {}
         super(Config, self).__init__(*args, **kwargs)
         self.fill_defaults(default_settings)
         # for f in default_files:
@@ -66,6 +90,34 @@ class Config(ConfigParser.ConfigParser, object):
             for opt, value in opts.iteritems():
                 self.set(sect, opt, value)
 
+    def changed(self):
+        """Forget the parsed values, since the config has changed"""
+        self.version += 1
+        self._parsed = {}
+
+    def read(self, filenames):
+        ret = super(Config, self).read(filenames)
+        self.changed()
+        return ret
+
+    def readfp(self, fp, filename=None):
+        super(Config, self).readfp(fp, filename)
+        self.changed()
+
+    def set(self, section, option, value=None):
+        super(Config, self).set(section, option, value)
+        self.changed()
+
+    def remove_option(self, section, option):
+        ret = super(Config, self).remove_option(section, option)
+        self.changed()
+        return ret
+
+    def remove_section(self, section):
+        ret = super(Config, self).remove_section(section)
+        self.changed()
+        return ret
+
     def get(self, section, option):
         """Override for hacking in UTF8 encoding."""
         r = super(Config, self).get(section, option)
@@ -73,15 +125,71 @@ class Config(ConfigParser.ConfigParser, object):
             return unicode(r, 'utf-8')
         return r
 
-    def get_commalist(self, section, option, *args, **kwargs):
+    def get_commalist(self, section, option):
         """Get/parse a comma separated list as a native list"""
-        raw = self.get(section, option, *args, **kwargs)
+        key = ('commalist', section, option)
+        ret = self._parsed.get(key)
+        if ret is None:
+            raw = self.get(section, option)
+            ret = []
+            if raw:
+                for e in raw.split(','):
+                    e = e.strip()
+                    if e:
+                        ret.append(e)
+            self._parsed[key] = ret
+        return list(ret)
+
+    def get_gtd_settings(self):
+        """Get the GTD settings, parsed and validated.
+
+        :rtype: GTDSettings
+
+        :raise ConfigError: If a setting has an invalid value.
+
+        """
+        ret = self._parsed.get('gtd')
+        if ret is not None:
+            return ret
+        try:
+            days = self.getint('gtd', 'activate-before-due-date')
+        except ValueError:
+            raise exceptions.ConfigError(
+                "activate-before-due-date must be a number of days, not: {}"
+                .format(self.get('gtd', 'activate-before-due-date')))
+        ret = self._parsed['gtd'] = GTDSettings(
+            target_projects=tuple(self.get_commalist('gtd',
+                                                     'target-projects')),
+            someday_projects=tuple(self.get_commalist('gtd',
+                                                      'someday-projects')),
+            activate_before_due_date=days,
+            ignore_labels=tuple(self.get_commalist('cleanup',
+                                                   'ignore-labels')))
+        return ret
+
+    def get_mail_rules(self):
+        """Get the rules for mails processed in batch.
+
+        :rtype: list
+        :return:
+            Tuples with (header, text to look for, quick add text). The header
+            and text are in lowercase. The header is None for the default
+            rule, which applies to all mails.
+
+        """
         ret = []
-        if raw:
-            for e in raw.split(','):
-                e = e.strip()
-                if e:
-                    ret.append(e)
+        for key, value in self.items('mail-rules', raw=True):
+            if not value:
+                continue
+            if isinstance(value, str):
+                value = unicode(value, 'utf-8')
+            if isinstance(key, str):
+                key = unicode(key, 'utf-8')
+            if key == 'default':
+                ret.append((None, None, value))
+                continue
+            header, _, match = key.lower().partition(' ')
+            ret.append((header, match.strip(), value))
         return ret
 
 
@@ -0,0 +1,355 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+"""Parsing of dates, in a subset of the formats Todoist accepts.
+
+All the date formats are combined into one precompiled pattern, with an
+optional time after the date. Dates must be whole words, so "Birthday" or
+"Nonetheless" don't contain a date. The result is a `ParsedDate`, telling if the
+date is relative, absolute or recurring, which can be given to Todoist as the
+`date_string`.
+
+Todoist only sets the due date of an item after the change is synced. The
+formats in `dateformats` are therefore resolved locally as well, with
+`get_due_date_utc`, to have the right due date before the next sync. Dates
+without time are due at the end of the day, in local time, like in Todoist.
+
+"""
+
+from __future__ import unicode_literals
+
+import re
+import calendar
+import time
+from datetime import datetime, timedelta
+
+from .recurrence import recurrence_formats, parse_recurrence
+
+""" The supported date formats, as regular expressions, in priority order """
+dateformats = (r'(after |every )?(mon|tues|wednes|thurs|fri|satur|sun)day',
+               r'(after |every )?tomorrow',
+               r'today',
+               r'none',
+               r'(after |every )?(\d+ )?(work)?day(s)?',
+               r'(after |every )?next month', r'(after |every )?next year',
+               r'[0-3]?[0-9]\. [a-z]{3,6}( \d{4})?',
+               r'in \d+ (day|week|month|year)s?',
+               ) + recurrence_formats
+
+""" The supported time formats, which could come after a date """
+timeformats = (r'[0-1][0-9]:[0-5][0-9]',)
+
+""" Formats for specific dates, and not relative to today """
+absolute_formats = (r'[0-3]?[0-9]\. [a-z]{3,6}( \d{4})?',)
+
+
+class ParsedDate(object):
+    """A date found in text.
+
+    :ivar text: The whole date, including the time, as found in the text.
+    :ivar date: The date part.
+    :ivar time: The time part, or None.
+    :ivar kind: "relative", "absolute", "recurring" or "none".
+    :ivar span: The start and end of the date in the text.
+
+    """
+
+    def __init__(self, text, date, time, kind, span=None):
+        self.text = text
+        self.date = date
+        self.time = time
+        self.kind = kind
+        self.span = span
+
+    @property
+    def date_string(self):
+        """The date as Todoist's `date_string`. None for unsetting it."""
+        if self.kind == 'none':
+            return None
+        return self.text
+
+    def is_recurring(self):
+        return self.kind == 'recurring'
+
+    def get_schedule(self):
+        """Return the recurring date as an Everdo schedule, else None.
+
+        :raise UnhandledDateError: If the recurring format isn't supported.
+
+        """
+        if not self.is_recurring():
+            return None
+        return parse_recurrence(self.text)
+
+    def __repr__(self):
+        return '<ParsedDate {} {!r}>'.format(self.kind, self.text)
+
+
+class DateGrammar(object):
+    """A precompiled pattern of date formats, with an optional time.
+
+    The longest date in the text wins, and the first of them if several are
+    equally long. The combined pattern finds where dates start in one scan,
+    and the formats are then compared only at those positions.
+
+    """
+
+    def __init__(self, formats=dateformats, times=timeformats):
+        self.formats = tuple(formats)
+        self.times = tuple(times)
+        self.kinds = {}
+        for i, f in enumerate(self.formats):
+            name = 'f{}'.format(i)
+            self.kinds[name] = 'absolute' if f in absolute_formats else None
+        self._pattern = None
+        self._full_pattern = None
+        self._format_patterns = None
+
+    def _compile(self, formats, end=''):
+        """Compile the given formats, by index, into one pattern"""
+        parts = [r'(?P<f{}>\b(?:{})\b)'.format(i, self.formats[i])
+                 for i in formats]
+        return re.compile(
+            r'(?P<date>{})(?: (?P<time>\b(?:{})\b))?{}'.format(
+                '|'.join(parts), '|'.join(self.times), end),
+            re.IGNORECASE | re.UNICODE)
+
+    @property
+    def pattern(self):
+        """The compiled pattern. Compiled on first use, to start faster."""
+        if self._pattern is None:
+            self._pattern = self._compile(range(len(self.formats)))
+        return self._pattern
+
+    @property
+    def full_pattern(self):
+        """The pattern, for matching the whole text"""
+        if self._full_pattern is None:
+            self._full_pattern = self._compile(range(len(self.formats)),
+                                               end=r'\Z')
+        return self._full_pattern
+
+    @property
+    def format_patterns(self):
+        """A pattern per format, for finding the longest date"""
+        if self._format_patterns is None:
+            self._format_patterns = [self._compile([i])
+                                     for i in range(len(self.formats))]
+        return self._format_patterns
+
+    def get_kind(self, match):
+        """Return the kind of date of a match of the pattern"""
+        date = match.group('date').lower()
+        if date == 'none':
+            return 'none'
+        if date.startswith(('every', 'after')):
+            return 'recurring'
+        groups = match.groupdict()
+        for name, kind in self.kinds.iteritems():
+            if groups.get(name) is not None:
+                return kind or 'relative'
+        return 'relative'
+
+    def _parsed(self, m):
+        if not m:
+            return None
+        return ParsedDate(m.group(0), m.group('date'), m.group('time'),
+                          self.get_kind(m), m.span())
+
+    def search(self, text):
+        """Find the longest date in text.
+
+        :rtype: ParsedDate or None
+
+        """
+        best = None
+        for candidate in self.pattern.finditer(text):
+            for p in self.format_patterns:
+                m = p.match(text, candidate.start())
+                if m and (best is None or
+                          m.end() - m.start() > best.end() - best.start()):
+                    best = m
+        return self._parsed(best)
+
+    def match(self, text):
+        """Match text that must be a date, with an optional time.
+
+        :rtype: ParsedDate or None
+
+        """
+        return self._parsed(self.full_pattern.match(text.strip()))
+
+
+""" The grammar of all the supported formats """
+date_grammar = DateGrammar()
+
+""" Format of Todoist's `due_date_utc` """
+utc_format = '%a %d %b %Y %H:%M:%S +0000'
+
+_weekdays = ('mon', 'tues', 'wednes', 'thurs', 'fri', 'satur', 'sun')
+_months = ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep',
+           'oct', 'nov', 'dec')
+
+_weekday_re = re.compile(r'^(?:every )?({})day$'.format('|'.join(_weekdays)))
+_days_re = re.compile(r'^(\d+) (work)?days?$')
+_after_re = re.compile(r'^after (?:(\d+) )?(work)?days?$')
+_every_re = re.compile(r'^every (?:(?:\d+|other) )?'
+                       r'(?:(work)day|weekday|day|week|month|year)s?$')
+_in_re = re.compile(r'^in (\d+) (day|week|month|year)s?$')
+_monthday_re = re.compile(r'^([0-3]?[0-9])\. ([a-z]{3,6})(?: (\d{4}))?$')
+_time_re = re.compile(r'^([0-1][0-9]):([0-5][0-9])$')
+
+
+def add_months(d, months):
+    """Return the date given months later, on the same day if possible"""
+    month = d.month - 1 + months
+    year = d.year + month // 12
+    month = month % 12 + 1
+    day = min(d.day, calendar.monthrange(year, month)[1])
+    return d.replace(year=year, month=month, day=day)
+
+
+def next_workday(d):
+    """Return the date if a workday, or else the next workday"""
+    while d.weekday() >= 5:
+        d += timedelta(1)
+    return d
+
+
+def add_workdays(d, days):
+    """Return the date given workdays later"""
+    for _ in xrange(days):
+        d = next_workday(d + timedelta(1))
+    return d
+
+
+def resolve_date(datestring, today):
+    """Return the date a date string is due next, in local time.
+
+    Only the formats in `dateformats` are resolved, and for recurring dates
+    only the simple intervals and weekdays.
+
+    :type datestring: unicode
+    :param datestring: The date, without time.
+
+    :type today: datetime.date
+
+    :rtype: datetime.date
+    :return: The date, or None if not resolved.
+
+    """
+    d = datestring.strip().lower()
+    if d == 'today':
+        return today
+    if d == 'tomorrow':
+        return today + timedelta(1)
+    m = _weekday_re.match(d)
+    if m:
+        days = (_weekdays.index(m.group(1)) - today.weekday()) % 7
+        return today + timedelta(days)
+    m = _days_re.match(d)
+    if m:
+        if m.group(2):
+            return add_workdays(today, int(m.group(1)))
+        return today + timedelta(int(m.group(1)))
+    m = _after_re.match(d)
+    if m:
+        days = int(m.group(1) or 1)
+        if m.group(2):
+            return add_workdays(today, days)
+        return today + timedelta(days)
+    m = _every_re.match(d)
+    if m:
+        if m.group(1) or 'weekday' in d:
+            return next_workday(today)
+        return today
+    if d == 'next month':
+        return add_months(today.replace(day=1), 1)
+    if d == 'next year':
+        return today.replace(year=today.year + 1, month=1, day=1)
+    m = _in_re.match(d)
+    if m:
+        count, unit = int(m.group(1)), m.group(2)
+        if unit == 'day':
+            return today + timedelta(count)
+        if unit == 'week':
+            return today + timedelta(7 * count)
+        return add_months(today, count * (12 if unit == 'year' else 1))
+    m = _monthday_re.match(d)
+    if m and m.group(2)[:3] in _months:
+        month = _months.index(m.group(2)[:3]) + 1
+        year = int(m.group(3) or today.year)
+        try:
+            ret = today.replace(year=year, month=month, day=int(m.group(1)))
+        except ValueError:
+            return None
+        if not m.group(3) and ret < today:
+            ret = ret.replace(year=year + 1)
+        return ret
+    return None
+
+
+def resolve(datestring, now=None):
+    """Return when a date string is due, as a UTC datetime.
+
+    :type datestring: unicode
+    :param datestring: Todoist's `date_string`, optionally with a time.
+
+    :type now: datetime.datetime
+    :param now: The local time to resolve from. Default is now.
+
+    :rtype: datetime.datetime
+    :return: The due time in UTC, without tzinfo, or None if the date string
+        is empty, "none" or not resolved.
+
+    """
+    if not datestring:
+        return None
+    parsed = date_grammar.search(datestring)
+    if not parsed or parsed.kind == 'none':
+        return None
+    if now is None:
+        now = datetime.now()
+    date = resolve_date(parsed.date, now.date())
+    if date is None:
+        return None
+    local = datetime(date.year, date.month, date.day, 23, 59, 59)
+    m = _time_re.match(parsed.time or '')
+    if m:
+        local = local.replace(hour=int(m.group(1)), minute=int(m.group(2)),
+                              second=0)
+    return datetime.utcfromtimestamp(time.mktime(local.timetuple()))
+
+
+def get_schedule(datestring):
+    """Return the Everdo schedule of a recurring date string, else None.
+
+    Date strings the grammar knows are not recurring are skipped without
+    further parsing. The rest are given to `parse_recurrence`, which also
+    handles shorthands like "daily".
+
+    :raise UnhandledDateError: If the recurring format isn't supported.
+
+    """
+    parsed = date_grammar.match(datestring)
+    if parsed is not None and not parsed.is_recurring():
+        return None
+    return parse_recurrence(datestring)
+
+
+def is_no_date(datestring):
+    """Tell if a date string removes the date, i.e. is empty or "none"."""
+    return not datestring or datestring.strip().lower() == 'none'
+
+
+def get_due_date_utc(datestring, now=None):
+    """Return the due date of a date string, in Todoist's format.
+
+    :rtype: unicode
+    :return: Like `due_date_utc`, or None if not resolved.
+
+    """
+    due = resolve(datestring, now)
+    if due is None:
+        return None
+    return unicode(due.strftime(utc_format))
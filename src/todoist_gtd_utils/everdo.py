@@ -57,43 +57,48 @@ TODO:
 
 """
 
+from __future__ import print_function
 from __future__ import unicode_literals
 
 import calendar
+import codecs
+import collections
 import datetime
+import gzip
+import hashlib
 import json
+import os
+import tempfile
 import time
 import uuid
 
 from . import utils
+# Defined with the date parsing, which shouldn't load this module
+from .recurrence import Everdo_Schedule
 
 
-def gen_uuid():
-    """ Create an UUID4 as Everdo wants it.
+""" Namespace for the UUIDs created from Todoist ids. Do not change! """
+todoist_namespace = uuid.UUID('6a0e4d5e-8a2c-5b59-9d0b-2f4f1c3e7a10')
+
+
+def gen_uuid(*keys):
+    """ Create an UUID as Everdo wants it.
 
     «Those are GUIDs. You can create your own random UUID-4. Make sure it’s
     an uppercase string without dashes. When referring to another item,
     make sure it really exists.»
 
-    """
-    return uuid.uuid4().hex.upper()
-
-
-def encode(data):
-    """Encode unicode to utf8 recursively
-
-    (Yes, switching to py3 would be easier…)
+    :param keys:
+        If given, the UUID is an UUID-5 created from the keys, e.g. the kind of
+        object and its Todoist id. The same keys always gives the same UUID,
+        so that a new export doesn't create new objects in Everdo. Without
+        keys, a random UUID-4 is returned.
 
     """
-    if isinstance(data, (Everdo_Tag, Everdo_Item)):
-        return encode(data.data)
-    if isinstance(data, dict):
-        return dict((k, encode(v)) for k, v in data.iteritems())
-    if isinstance(data, (list, tuple)):
-        return tuple(encode(i) for i in data)
-    if isinstance(data, unicode):
-        return data.encode('utf-8')
-    return data
+    if keys:
+        name = ':'.join(unicode(k) for k in keys)
+        return uuid.uuid5(todoist_namespace, name.encode('utf-8')).hex.upper()
+    return uuid.uuid4().hex.upper()
 
 
 def duedateutc2stamp(dat):
@@ -117,11 +122,84 @@ class Everdo_File(object):
         # All items, by their ID
         self.eitems = {}
 
-    def export(self, fp):
-        output = {'items': encode(self.items),
-                  'tags': encode(self.tags),
-                  }
-        json.dump(output, fp, ensure_ascii=False, indent=4)
+    def export(self, fp, compact=False, compress=False, manifest=None,
+               items=None, tags=None):
+        """Write the data as an Everdo JSON file.
+
+        The items and tags are serialized and written one at a time, so the
+        whole JSON document is never built in memory.
+
+        :type fp: file
+        :param fp: Where to write the UTF-8 encoded JSON data.
+
+        :type compact: bool
+        :param compact: If True, the JSON is written without whitespace.
+
+        :type compress: bool
+        :param compress: If True, the output is gzip compressed.
+
+        :type manifest: Everdo_Manifest
+        :param manifest:
+            If given, only items and tags that are new or changed since the
+            manifest was updated are written, and the manifest gets updated.
+            Remember to save the manifest afterwards.
+
+        :type items: list
+        :param items: The items to write. Default is all.
+
+        :type tags: list
+        :param tags: The tags to write. Default is all.
+
+        :rtype: dict
+        :return: The number of written records, by "items" and "tags".
+
+        """
+        if compress:
+            gz = gzip.GzipFile(fileobj=fp, mode='wb')
+            try:
+                return self.export(gz, compact=compact, manifest=manifest,
+                                   items=items, tags=tags)
+            finally:
+                gz.close()
+        if compact:
+            encoder = json.JSONEncoder(ensure_ascii=False,
+                                       separators=(',', ':'))
+            newline = indent = space = ''
+        else:
+            encoder = json.JSONEncoder(ensure_ascii=False, indent=4,
+                                       separators=(',', ': '))
+            newline, indent, space = '\n', ' ' * 4, ' '
+
+        def write(txt):
+            if isinstance(txt, unicode):
+                txt = txt.encode('utf-8')
+            fp.write(txt)
+
+        counts = {}
+        write('{')
+        if items is None:
+            items = self.items
+        if tags is None:
+            tags = self.tags
+        for n, (name, records) in enumerate((('items', items),
+                                             ('tags', tags))):
+            if n:
+                write(',')
+            write('{}{}"{}":{}['.format(newline, indent, name, space))
+            if manifest is not None:
+                records = manifest.filter_changed(records)
+            counts[name] = 0
+            for i, record in enumerate(records):
+                counts[name] += 1
+                if i:
+                    write(',')
+                # Strings are escaped, so only indentation contains newlines
+                write(newline + indent * 2)
+                write(encoder.encode(record.to_dict()).replace(
+                                                '\n', newline + indent * 2))
+            write(newline + indent + ']')
+        write(newline + '}' + newline)
+        return counts
 
     def add_tag(self, etag, tlabel):
         self.tags.append(etag)
@@ -139,35 +217,506 @@ class Everdo_File(object):
         eid = self.todoist2everdo[t_id]
         return self.eitems[eid]
 
+    def validate(self, items=None, tags=None):
+        """Check the data against the rules of the Everdo format.
 
-class Everdo_Schedule(dict):
-    """Handle the Schedule model for Everdo.
+        Everdo silently skips an import with invalid data, so this should be
+        checked before exporting. The ids are indexed first, so each
+        reference is checked in constant time.
 
-    Based on best guesses… Example::
+        Only the given items and tags are checked, e.g. the ones written to
+        an incremental export. Their references are looked up among all the
+        records, which Everdo got with earlier exports.
 
-        "schedule": {
-            "type": "Daily",
-            "period": 1,
-            "daysOfWeek": null,
-            "daysOfMonth": null,
-            "daysOfYear": null,
-            "limit": null,
-            "endDate": null,
-            "autoDueDate": true
-        },
+        :type items: list
+        :param items: The items to check. Default is all.
+
+        :type tags: list
+        :param tags: The tags to check. Default is all.
+
+        :rtype: list
+        :return: Descriptions of the problems found. Empty if valid.
+
+        """
+        if items is None:
+            items = self.items
+        if tags is None:
+            tags = self.tags
+        problems = []
+        all_tags = dict((tag['id'], tag) for tag in self.tags)
+        all_items = dict((item['id'], item) for item in self.items)
+
+        seen = set()
+        for tag in tags:
+            if tag['id'] in seen:
+                problems.append("Duplicate tag id {}".format(tag['id']))
+            seen.add(tag['id'])
+            if tag['type'] not in Everdo_Tag.tag_types:
+                problems.append("Tag {} has invalid type {!r}"
+                                .format(tag['id'], tag['type']))
+        seen = set()
+        for item in items:
+            if item['id'] in seen:
+                problems.append("Duplicate item id {}".format(item['id']))
+            seen.add(item['id'])
+
+        def problem(item, msg, *args):
+            problems.append("Item {} ({}): {}".format(
+                item['id'], item['title'][:50], msg.format(*args)))
+
+        for item in items:
+            typ = item.get('type')
+            lst = item['list']
+            if typ not in Everdo_Item.item_types:
+                problem(item, "Invalid type {!r}", typ)
+            if lst not in Everdo_Item.list_types:
+                problem(item, "Invalid list {!r}", lst)
+            if lst == 'i' and typ != 'a':
+                problem(item,
+                        "Only actions can be in the inbox, not type {!r}", typ)
+            if lst == 's' and not (item['start_date'] or item['schedule']):
+                problem(item, "Scheduled without start_date or schedule")
+            if lst == 'r' and not item['completed_on']:
+                problem(item, "Archived without completed_on")
+
+            parent_id = item.get('parent_id')
+            if parent_id:
+                parent = all_items.get(parent_id)
+                if parent is None:
+                    problem(item, "Parent {} doesn't exist", parent_id)
+                elif parent.get('type') not in ('p', 'l'):
+                    problem(item, "Parent {} is not a project or notebook",
+                            parent_id)
+            contact_id = item['contact_id']
+            if contact_id:
+                contact = all_tags.get(contact_id)
+                if contact is None:
+                    problem(item, "Contact {} doesn't exist", contact_id)
+                elif contact['type'] != 'c':
+                    problem(item, "Contact {} is not a contact tag",
+                            contact_id)
+            for tag_id in item['tags'] or ():
+                if tag_id not in all_tags:
+                    problem(item, "Tag {} doesn't exist", tag_id)
+        return problems
+
+
+class Everdo_Manifest(object):
+    """The state of earlier exports, for exporting only what has changed.
+
+    Stores a hash of the content of every exported item and tag, by their id.
+    Works best with ids from `gen_uuid` with keys, since random ids are new
+    for every export.
+
+    """
+
+    """ Fields that are not compared, since they change between runs """
+    ignored_fields = ('created_on',)
+
+    def __init__(self, filename=None):
+        """ Load the manifest.
+
+        :type filename: str
+        :param filename:
+            JSON file to load from, and save to. Starts blank if it doesn't
+            exist.
+
+        """
+        self.filename = filename
+        self.hashes = {}
+        if filename and os.path.exists(filename):
+            with open(filename, 'rb') as f:
+                self.hashes = json.load(f)
+
+    def save(self, filename=None):
+        """Write the manifest, replacing the old one in one operation.
+
+        Should only be called when the export has been written, or else the
+        next export skips records that Everdo never got.
+
+        """
+        filename = filename or self.filename
+        fd, tmpname = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(filename)))
+        with os.fdopen(fd, 'wb') as f:
+            json.dump(self.hashes, f, indent=0, sort_keys=True)
+        os.rename(tmpname, filename)
+
+    @classmethod
+    def get_hash(cls, record):
+        """Return a hash of the content of an item or tag"""
+        data = record.to_dict()
+        for k in cls.ignored_fields:
+            data.pop(k, None)
+        if 'completed_on' in data:
+            # When something got completed matters less than if it is
+            data['completed_on'] = bool(data['completed_on'])
+        raw = json.dumps(data, sort_keys=True, ensure_ascii=True)
+        return hashlib.sha1(raw).hexdigest()
+
+    def filter_changed(self, records):
+        """Iterate over the new and changed records, and update the hashes"""
+        for record in records:
+            h = self.get_hash(record)
+            if self.hashes.get(record.data['id']) != h:
+                self.hashes[record.data['id']] = h
+                yield record
+
+
+def iter_everdo_file(fp, chunk_size=64 * 1024):
+    """Read an Everdo JSON file, one item or tag at a time.
+
+    The file is read in chunks, and the records are decoded one by one, so
+    the whole file is never loaded in memory. Gzip compressed files, like from
+    `Everdo_File.export`, are decompressed on the fly.
+
+    :type fp: file
+    :param fp: The file, opened in binary mode.
+
+    :rtype: generator
+    :return:
+        Tuples with the name of the list the record is in, "items" or "tags",
+        and the record as a dict.
+
+    """
+    head = fp.read(2)
+    if head == b'\x1f\x8b':
+        fp.seek(0)
+        fp = gzip.GzipFile(fileobj=fp, mode='rb')
+        head = b''
+    return _JSONStream(fp, head, chunk_size).iter_records()
+
+
+class _JSONStream(object):
+    """Incremental decoding of a JSON object with lists of objects."""
+
+    whitespace = ' \t\n\r'
+
+    def __init__(self, fp, head=b'', chunk_size=64 * 1024):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buf = self.utf8.decode(head)
+        self.pos = 0
+        self.eof = False
+
+    def read(self):
+        """Read more data into the buffer. Returns False at end of file."""
+        if self.eof:
+            return False
+        data = self.fp.read(self.chunk_size)
+        self.buf = self.buf[self.pos:] + self.utf8.decode(data,
+                                                          final=not data)
+        self.pos = 0
+        self.eof = not data
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace char, or None at end of file."""
+        while True:
+            while (self.pos < len(self.buf) and
+                    self.buf[self.pos] in self.whitespace):
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.read():
+                return None
+
+    def expect(self, chars):
+        char = self.peek()
+        if char is None or char not in chars:
+            raise ValueError("Expected one of {!r} at char {}, got {!r}"
+                             .format(chars, self.pos, char))
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """Decode the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if self.read():
+                    continue
+                raise
+            if end == len(self.buf) and self.read():
+                # A number could continue in the next chunk
+                continue
+            self.pos = end
+            return value
+
+    def iter_records(self):
+        self.expect('{')
+        if self.peek() == '}':
+            return
+        while True:
+            key = self.decode()
+            self.expect(':')
+            if self.peek() == '[':
+                self.expect('[')
+                if self.peek() != ']':
+                    while True:
+                        yield key, self.decode()
+                        if self.expect(',]') == ']':
+                            break
+                else:
+                    self.expect(']')
+            else:
+                # Not a list of records, ignore
+                self.decode()
+            if self.expect(',}') == '}':
+                return
+
+
+def title2label_name(title):
+    """Todoist doesn't allow spaces in label names"""
+    return '_'.join(title.split())
+
+
+def stamp2datestring(stamp):
+    """Format a UNIX timestamp as a date string Todoist understands"""
+    return datetime.datetime.utcfromtimestamp(stamp).strftime('%Y-%m-%d')
+
+
+class EverdoImporter(object):
+    """Add Everdo records to Todoist, in the order they are read.
+
+    Items can come before their project, and tags are listed after the items
+    in Everdo's files. Items are therefore held back until their project is
+    added, and labels that are not yet added are set on the items at the end.
+
+    Usage::
+
+        importer = EverdoImporter(api)
+        for kind, record in iter_everdo_file(fp):
+            importer.add(kind, record)
+        importer.finish()
+
+    """
+    def __init__(self, api):
+        """
+        :type api: TodoistGTD
+
+        :raise NotFoundError: If the Inbox project is not found.
+
+        """
+        self.api = api
+        self.inbox = api.get_project_by_name('Inbox')
+        someday = api.get_somedaymaybe()
+        self.someday = someday[0] if someday else self.inbox
+        self.waiting_label = api.get_label_id('waiting',
+                                              raise_on_missing=False)
+        # Todoist objects, by Everdo id. The objects are kept, and not their
+        # id, since temp ids gets replaced when committed.
+        self.projects = {}
+        self.labels = {}
+        # Everdo ids of skipped projects
+        self.skipped = set()
+        # Items waiting for their project, by the project's Everdo id
+        self.pending = {}
+        # Items with tags that were not added yet, with the Everdo tag ids
+        self.unresolved = []
+        self.new_labels = False
+        self.stats = collections.Counter()
+
+    def add(self, kind, record):
+        """Add a record, as given by `iter_everdo_file`"""
+        if kind == 'tags':
+            self.add_tag(record)
+        elif kind == 'items':
+            self.add_record(record)
+
+    def add_tag(self, tag):
+        if tag.get('removed_ts'):
+            self.stats['skipped tags'] += 1
+            return
+        name = title2label_name(tag['title'])
+        label_id = self.api.get_label_id(name, raise_on_missing=False)
+        if label_id is not None:
+            self.labels[tag['id']] = self.api.labels.get_by_id(label_id)
+            return
+        self.api.commit_when_full(margin=1)
+        self.labels[tag['id']] = self.api.labels.add(name)
+        self.new_labels = True
+        self.stats['labels'] += 1
+
+    def add_record(self, record):
+        if record.get('list') == 'd' or record.get('completed_on'):
+            if record['type'] in ('p', 'l'):
+                self.skip_project(record['id'])
+            self.stats['skipped items'] += 1
+            return
+        if record['type'] in ('p', 'l'):
+            self.add_project(record)
+            return
+
+        parent_id = record.get('parent_id')
+        if not parent_id:
+            project = self.inbox
+            if record.get('list') == 'm':
+                project = self.someday
+            self.add_item(record, project)
+        elif parent_id in self.projects:
+            self.add_item(record, self.projects[parent_id])
+        elif parent_id in self.skipped:
+            self.stats['skipped items'] += 1
+        else:
+            self.pending.setdefault(parent_id, []).append(record)
+
+    def skip_project(self, project_id):
+        self.skipped.add(project_id)
+        self.stats['skipped items'] += len(self.pending.pop(project_id, ()))
+
+    def add_project(self, record):
+        self.api.commit_when_full(margin=2)
+        project = self.api.projects.add(record['title'])
+        if (record.get('note') or '').strip():
+            self.api.project_notes.add(project['id'], record['note'])
+        self.projects[record['id']] = project
+        self.stats['projects'] += 1
+        for r in self.pending.pop(record['id'], ()):
+            self.add_item(r, project)
+
+    def get_labels(self, record):
+        """Return the label ids of an item, and tag ids not added yet"""
+        tag_ids = list(record.get('tags') or ())
+        if record.get('contact_id'):
+            tag_ids.append(record['contact_id'])
+        labels = []
+        unresolved = []
+        for t in tag_ids:
+            if t in self.labels:
+                labels.append(self.labels[t]['id'])
+            else:
+                unresolved.append(t)
+        if record.get('list') == 'w' and self.waiting_label:
+            labels.append(self.waiting_label)
+        return labels, unresolved
+
+    def add_item(self, record, project):
+        if self.new_labels:
+            # Make sure the labels have real ids before they are used
+            self.api.force_commit()
+            self.new_labels = False
+        labels, unresolved = self.get_labels(record)
+        kwargs = {}
+        date = record.get('due_date')
+        if not date and record.get('list') == 's':
+            date = record.get('start_date')
+        if date:
+            kwargs['date_string'] = stamp2datestring(date)
+        if record.get('schedule'):
+            self.stats['skipped schedules'] += 1
+
+        self.api.commit_when_full(margin=2)
+        item = self.api.items.add(record['title'], project_id=project['id'],
+                                  labels=labels, **kwargs)
+        if (record.get('note') or '').strip():
+            self.api.notes.add(item['id'], record['note'])
+            self.stats['notes'] += 1
+        if unresolved:
+            self.unresolved.append((item, labels, unresolved))
+        self.stats['items'] += 1
+
+    def finish(self):
+        """Add what's left, and commit"""
+        for parent_id, records in self.pending.items():
+            print("WARN: Project {} not found, adding {} items to Inbox"
+                  .format(parent_id, len(records)))
+            for r in records:
+                self.add_item(r, self.inbox)
+        self.pending = {}
+
+        self.api.force_commit()
+        for item, labels, tag_ids in self.unresolved:
+            missing = [t for t in tag_ids if t not in self.labels]
+            if missing:
+                print("WARN: Tags not found for {}: {}".format(
+                    item['content'], ', '.join(missing)))
+            labels = labels + [self.labels[t]['id'] for t in tag_ids
+                               if t in self.labels]
+            self.api.commit_when_full(margin=1)
+            item.update(labels=labels)
+        self.unresolved = []
+        self.api.force_commit()
+
+
+class Everdo_Record(object):
+    """Base for the records in the Everdo file format.
+
+    The fields are stored in `__slots__` instead of a dict per record, to keep
+    the memory use down for large exports. Records behave like a dict of the
+    fields, and `data` returns the record itself, so `record.data['id']`
+    works. Fields that are not set are not part of the record.
 
     """
-    def __init__(self, type=None, period=None, daysOfWeek=None,
-                 daysOfMonth=None, daysOfYear=None, limit=None, endDate=None,
-                 autoDueDate=True):
-        vars = locals()
-        del vars['self']
-        super(Everdo_Schedule, self).__init__(**vars)
+    __slots__ = ()
+
+    """ All the fields, also from the parent classes """
+    fields = ()
+
+    @property
+    def data(self):
+        return self
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in self.fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.fields and hasattr(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
 
+    def keys(self):
+        return [k for k in self.fields if hasattr(self, k)]
 
-class Everdo_Tag(object):
+    def iteritems(self):
+        for k in self.fields:
+            try:
+                yield k, getattr(self, k)
+            except AttributeError:
+                continue
+
+    def to_dict(self):
+        """Return the record as a dict, in Everdo's JSON schema"""
+        return dict(self.iteritems())
+
+    def __eq__(self, other):
+        if not isinstance(other, Everdo_Record):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    # Records are mutable, and equal by their content
+    __hash__ = None
+
+    def __repr__(self):
+        return '<{} {}>'.format(type(self).__name__, self.to_dict())
+
+
+class Everdo_Tag(Everdo_Record):
     """A tag in the Everdo file format"""
 
+    __slots__ = ('id', 'title', 'title_ts', 'color', 'color_ts', 'type',
+                 'type_ts', 'created_on', 'changed_ts', 'removed_ts')
+    fields = __slots__
+
     tag_types = (
         "c",  # contact
         "a",  # area
@@ -183,7 +732,8 @@ class Everdo_Tag(object):
                  color=None,
                  color_ts=None,
                  changed_ts=None,
-                 removed_ts=None):
+                 removed_ts=None,
+                 id=None):
         """ Create tag.
 
         :param tag_type:
@@ -197,6 +747,9 @@ class Everdo_Tag(object):
             Creation date. Format: UNIX timestamp - seconds since UNIX epoch.
             The timestamp’s time must be set to 00:00:00.
 
+        :type id: str
+        :param id: The tag's id. Defaults to a random UUID.
+
         TODO: What's the *_ts parameters?
 
         """
@@ -205,24 +758,36 @@ class Everdo_Tag(object):
         if not created_on:
             created_on = int(time.time())
 
-        self.data = {
-                'id': gen_uuid(),
-                'title': title,
-                'title_ts': title_ts,
-                'color': color,
-                'color_ts': color_ts,
-                'type': tag_type,
-                'type_ts': tag_type_ts,
-                'created_on': created_on,
-                'changed_ts': changed_ts,
-                'removed_ts': removed_ts,
-                }
+        self.id = id or gen_uuid()
+        self.title = title
+        self.title_ts = title_ts
+        self.color = color
+        self.color_ts = color_ts
+        self.type = tag_type
+        self.type_ts = tag_type_ts
+        self.created_on = created_on
+        self.changed_ts = changed_ts
+        self.removed_ts = removed_ts
         # Add positions?
 
 
-class Everdo_Item(object):
+class Everdo_Item(Everdo_Record):
     """An item in the Everdo file format"""
 
+    # type and parent_id are set by the subclasses
+    __slots__ = ('id', 'type', 'list', 'title', 'note', 'parent_id',
+                 'created_on', 'is_focused', 'start_date', 'schedule',
+                 'completed_on', 'energy', 'time_estimate', 'due_date',
+                 'recurrent_task_id', 'contact_id', 'tags', 'repeated_on')
+    fields = __slots__
+
+    item_types = (
+        "a",  # action
+        "p",  # project
+        "n",  # note
+        "l",  # notebook
+    )
+
     list_types = (
         "i",  # inbox (actions only)
         "a",  # active/next (based on item type)
@@ -249,7 +814,8 @@ class Everdo_Item(object):
                  note="",
                  tags=(),
                  repeated_on=None,
-                 positions=None):
+                 positions=None,
+                 id=None):
         """ Create item.
 
         :param list_type:
@@ -320,34 +886,37 @@ class Everdo_Item(object):
 
             - global: position in a the list of all items
 
+        :type id: str
+        :param id: The item's id. Defaults to a random UUID.
+
         """
         assert list_type in self.list_types, "Bad list type: %s" % list_type
 
         if not created_on:
             created_on = int(time.time())
 
-        self.data = {
-                'id': gen_uuid(),
-                'list': list_type,
-                'title': title,
-                'created_on': created_on,
-                'is_focused': int(bool(is_focused)),
-                'start_date': start_date,
-                'schedule': schedule,
-                'completed_on': completed_on,
-                'energy': energy,
-                'time_estimate': time_estimate,
-                'due_date': due_date,
-                'recurrent_task_id': recurrent_task_id,
-                'contact_id': contact_id,
-                'tags': tags,
-                'repeated_on': repeated_on,
-                'note': note,
-                }
+        self.id = id or gen_uuid()
+        self.list = list_type
+        self.title = title
+        self.created_on = created_on
+        self.is_focused = int(bool(is_focused))
+        self.start_date = start_date
+        self.schedule = schedule
+        self.completed_on = completed_on
+        self.energy = energy
+        self.time_estimate = time_estimate
+        self.due_date = due_date
+        self.recurrent_task_id = recurrent_task_id
+        self.contact_id = contact_id
+        self.tags = tags
+        self.repeated_on = repeated_on
+        self.note = note
         # Add positions?
 
 
 class Everdo_Action(Everdo_Item):
+    __slots__ = ()
+
     def __init__(self, parent, *args, **kwargs):
         """ Create action
 
@@ -364,6 +933,8 @@ class Everdo_Action(Everdo_Item):
 
 
 class Everdo_Project(Everdo_Item):
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         super(Everdo_Project, self).__init__(*args, **kwargs)
         if 'type' not in self.data:
@@ -371,6 +942,8 @@ class Everdo_Project(Everdo_Item):
 
 
 class Everdo_Note(Everdo_Item):
+    __slots__ = ()
+
     def __init__(self, parent, *args, **kwargs):
         """ Create note
 
@@ -388,6 +961,8 @@ class Everdo_Note(Everdo_Item):
 
 
 class Everdo_Notebook(Everdo_Item):
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs):
         super(Everdo_Notebook, self).__init__(*args, **kwargs)
         if 'type' not in self.data:
@@ -3,8 +3,18 @@
 
 """Exception classes used by project."""
 
+
 class NotFoundError(Exception):
     pass
 
+
 class DuplicateError(Exception):
     pass
+
+
+class UnhandledDateError(Exception):
+    pass
+
+
+class ConfigError(Exception):
+    pass
@@ -11,16 +11,32 @@ Todoist.
 from __future__ import unicode_literals
 
 import re
+import mmap
+import binascii
 import email
 import email.header
-from quopri import ishex
-from quopri import unhex
-import html2text
+import email.message
+from HTMLParser import HTMLParser
+from htmlentitydefs import name2codepoint
 from termcolor import colored
 
 from todoist_gtd_utils import utils
 from todoist_gtd_utils.utils import to_unicode
 
+try:
+    from email.parser import BytesFeedParser
+except ImportError:
+    # Python 2 parses bytes with the normal feed parser
+    from email.feedparser import FeedParser as BytesFeedParser
+
+""" Headers to store in the note of tasks created from mails """
+note_headers = ('Date', '*From', 'To', 'Message-Id', '_Reply-To', '*Subject',
+                '_Sender')
+
+""" Finds the Message-Id in a note created from `note_headers` """
+message_id_pattern = re.compile(r'^\**Message-Id: *(<[^>\s]+>)',
+                                re.IGNORECASE | re.MULTILINE)
+
 
 class SimpleMailParser(object):
     """Handling a given mail, by parsing and presenting its data.
@@ -30,12 +46,99 @@ class SimpleMailParser(object):
     """
     default_encoding = 'latin1'
 
-    def __init__(self, mailfile):
-        self.mail = email.message_from_file(mailfile)
+    """ The converter from `html_converters` to use for HTML parts """
+    html_converter = 'simple'
+
+    """ Max number of characters to convert from each HTML part """
+    html_max_size = None
+
+    """ Number of bytes to feed the parser at a time, for binary files """
+    chunk_size = 64 * 1024
+
+    def __init__(self, mailfile, html_converter=None, html_max_size=None):
+        """ Parse given mail.
+
+        :type mailfile: file or email.message.Message
+        :param mailfile:
+            A file object in text mode with the raw mail, or an already parsed
+            mail. See `from_binary_file` for binary files.
+
+        """
+        if isinstance(mailfile, email.message.Message):
+            self.mail = mailfile
+        else:
+            self.mail = email.message_from_file(mailfile)
+        if html_converter:
+            self.html_converter = html_converter
+        if html_max_size:
+            self.html_max_size = html_max_size
+        # Decoded headers, by lowercased name
+        self._headers = {}
+        # Decoded body texts, by if colored or not
+        self._body_texts = {}
+        self._parse_structure()
+
+    @classmethod
+    def from_binary_file(cls, fp, **kwargs):
+        """Parse a mail from a file object in binary mode.
+
+        The file is fed to the parser in chunks, from a memory map if
+        possible, so the whole mail is never read into memory as one string.
+        Temporary files from mutt could then be parsed without extra copies.
+
+        :type fp: file
+        :param fp: File object in binary mode, e.g. `open(path, 'rb')`.
+
+        """
+        parser = BytesFeedParser()
+        try:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, IOError, ValueError, EnvironmentError):
+            # Not a regular file, e.g. a pipe, or an empty file
+            data = None
+        if data is None:
+            for chunk in iter(lambda: fp.read(cls.chunk_size), b''):
+                parser.feed(chunk)
+        else:
+            try:
+                for i in xrange(0, len(data), cls.chunk_size):
+                    parser.feed(data[i:i + cls.chunk_size])
+            finally:
+                data.close()
+        return cls(parser.close(), **kwargs)
+
+    @classmethod
+    def from_filename(cls, filename, **kwargs):
+        """Parse a mail from a file, in binary mode"""
+        with open(filename, 'rb') as fp:
+            return cls.from_binary_file(fp, **kwargs)
+
+    def _parse_structure(self):
+        """Walk through the mail once, and sort out its parts.
+
+        All non-multipart parts are put in `body_parts`, in the mail's order.
+        The parts that are not text are also put in `attachment_parts`.
+
+        """
+        self.body_parts = []
+        self.attachment_parts = []
+        for p in self.mail.walk():
+            maintype = p.get_content_maintype()
+            if maintype == 'multipart':
+                continue
+            self.body_parts.append(p)
+            if maintype != 'text':
+                self.attachment_parts.append(p)
 
     def get_header(self, key):
         """Return a mail's header, unicodified."""
-        raw = self.mail.get(key)
+        lkey = key.lower()
+        if lkey not in self._headers:
+            self._headers[lkey] = self._decode_header(self.mail.get(key))
+        return self._headers[lkey]
+
+    @staticmethod
+    def _decode_header(raw):
         if not raw:
             return raw
         return utils.trim_whitespace(
@@ -60,15 +163,16 @@ class SimpleMailParser(object):
 
     def get_decoded_payload(self, p):
         """Get a decoded string of a given payload."""
-        txt = self.get_unicoded_payload(p)
-        if txt is None:
-            return ''
         if p.get_content_maintype() != 'text':
             # Only give a hint about that its existence. Might want to remove
             # this.
             return '<{}>'.format(p.get_content_type())
+        txt = self.get_unicoded_payload(p)
+        if txt is None:
+            return ''
         if p.get_content_type() == 'text/html':
-            txt = self.filter_html(txt)
+            # The converters return cleaned up text
+            return self.filter_html(txt)
         elif p.get_content_type() == 'text/plain':
             pass
         else:
@@ -76,32 +180,42 @@ class SimpleMailParser(object):
 
         # Add more content types to handle here
 
-        # Remove extra spaces
-        txt = re.sub('  +', ' ', txt).strip()
-        # Remove extra lines
-        txt = re.sub('\n\n\s*\n', '\n', txt).strip()
-        return txt
+        return cleanup_whitespace(txt)
 
-    @staticmethod
-    def filter_html(html):
-        """Return HTML as text. Much guesswork."""
-        txt = html2text.html2text(html)
-        txt = txt.replace('&lt;', '<')
-        txt = txt.replace('&gt;', '>')
-        # TODO: Fix missing data here
-        return txt
+    def filter_html(self, html):
+        """Return HTML as text, by the configured HTML converter."""
+        converter = html_converters[self.html_converter]
+        return converter(html, max_size=self.html_max_size)
 
     def get_body_text(self, color=True):
-        """Get text parts of body."""
-        ret = []
-        for p in self.mail.walk():
-            if p.get_content_maintype() == 'multipart':
-                continue
-            load = self.get_decoded_payload(p)
-            if color:
-                load = self.colorize_text_body(load)
-            ret.append(load)
-        return '\n'.join(ret)
+        """Get text parts of body.
+
+        The parts are only decoded once, and the result is reused.
+
+        """
+        color = bool(color)
+        if False not in self._body_texts:
+            self._body_texts[False] = [self.get_decoded_payload(p)
+                                       for p in self.body_parts]
+        if color not in self._body_texts:
+            self._body_texts[True] = [self.colorize_text_body(l)
+                                      for l in self._body_texts[False]]
+        return '\n'.join(self._body_texts[color])
+
+    def iter_attachments(self):
+        """Iterate over the payloads that are not text.
+
+        The attachments are decoded one at a time, when iterated over, so only
+        the attachment in use needs to be kept decoded in memory.
+
+        :rtype: generator
+        :return:
+            Tuples in the same format as in `get_attachments`.
+
+        """
+        for p in self.attachment_parts:
+            yield (p.get_content_type(), p.get_filename(),
+                   p.get_payload(decode=True))
 
     def get_attachments(self):
         """Get a list of payloads that are not text.
@@ -115,16 +229,8 @@ class SimpleMailParser(object):
                 ('application/pdf', 'report.pdf', '%PDF...')
 
         """
-        ret = []
-        for p in self.mail.walk():
-            if p.get_content_maintype() == 'multipart':
-                continue
-            if p.get_content_maintype() != 'text':
-                ret.append((p.get_content_type(),
-                            p.get_filename(),
-                            p.get_payload(decode=True)))
-            # TODO: other content types to include?
-        return ret
+        # TODO: other content types to include?
+        return list(self.iter_attachments())
 
     def colorize_text_body(self, body):
         """Add some formatting to mail body."""
@@ -179,58 +285,207 @@ class SimpleMailParser(object):
             lines.append(self.get_body_text(color=color))
         return '\n'.join(lines)
 
+    def get_note(self):
+        """Return the mail as text for a Todoist note.
 
-def decode_quoted_printable(input, header=0, encoding='utf-8'):
-    """As quopri.decodestring, but with Unicode support.
+        The note contains `note_headers`, and the body without formatting.
+
+        """
+        return self.get_presentation(*note_headers, color=False)
+
+
+def get_message_ids(text):
+    """Return the Message-Ids found in a text, e.g. a note from a mail."""
+    return message_id_pattern.findall(text)
 
-    This is mainly a copy quopri.decodestring, slightly rewritten just to
-    support unicode, and in a hackish way!
 
-    TODO: Are there libraries that support this in unicode to rely on instead?
+_multiple_spaces = re.compile('  +')
+_multiple_lines = re.compile('\n\n\s*\n')
+
+
+def cleanup_whitespace(txt):
+    """Remove extra spaces and lines from text"""
+    txt = _multiple_spaces.sub(' ', txt).strip()
+    return _multiple_lines.sub('\n', txt).strip()
+
+
+class HTMLTextConverter(HTMLParser):
+    """Lightweight, streaming conversion from HTML to plain text.
+
+    Much simpler than html2text, but a lot faster. Contents of style and script
+    tags are dropped, and whitespace is collapsed while the text is fed, so no
+    extra passes over the result are needed.
+
+    Feed the HTML in chunks, and stop feeding when `is_full()` is True.
 
     """
-    ESCAPE = '='
-    ret = []
-    new = bytearray()
-    for line in input.split('\n'):
-        if not line:
-            # TODO: wat?
-            break
-        i = 0
-        n = len(line)
-        if line.endswith('\n'):
-            partial = 0
-            n = n-1
-            # Strip trailing whitespace
-            while n > 0 and line[n-1] in " \t\r":
-                n = n-1
+
+    """ Tags where the content is not text for humans """
+    skip_tags = ('style', 'script', 'title')
+
+    """ Tags that break the text into a new paragraph """
+    paragraph_tags = ('p', 'div', 'table', 'ul', 'ol', 'blockquote', 'pre',
+                      'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr')
+
+    """ Tags that break the text into a new line """
+    line_tags = ('br', 'tr', 'li', 'dt', 'dd')
+
+    _whitespace = re.compile(r'\s+', re.UNICODE)
+
+    def __init__(self, max_size=None):
+        """ Init converter.
+
+        :type max_size: int
+        :param max_size:
+            If set, stop collecting text when this number of characters is
+            reached.
+
+        """
+        HTMLParser.__init__(self)
+        self.max_size = max_size
+        self.size = 0
+        self.output = []
+        self._skip = 0
+        self._newlines = 0
+        self._space = False
+        self._href = None
+
+    def is_full(self):
+        return bool(self.max_size) and self.size >= self.max_size
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.skip_tags:
+            self._skip += 1
+        elif tag in self.paragraph_tags:
+            self._break(2)
+        elif tag in self.line_tags:
+            self._break(1)
+            if tag == 'li':
+                self._write('- ')
+        elif tag == 'a':
+            self._href = dict(attrs).get('href')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in self.paragraph_tags:
+            self._break(2)
+        elif tag in self.line_tags:
+            self._break(1)
+
+    def handle_endtag(self, tag):
+        if tag in self.skip_tags:
+            self._skip = max(self._skip - 1, 0)
+        elif tag in self.paragraph_tags:
+            self._break(2)
+        elif tag == 'a' and self._href:
+            if self._href.startswith(('http:', 'https:', 'mailto:')):
+                self.handle_data(' <{}>'.format(self._href))
+            self._href = None
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        data = self._whitespace.sub(' ', data)
+        if data.startswith(' '):
+            self._space = True
+        text = data.strip(' ')
+        if text:
+            self._write(text)
+            self._space = data.endswith(' ')
+
+    def handle_entityref(self, name):
+        if name in name2codepoint:
+            self.handle_data(unichr(name2codepoint[name]))
         else:
-            partial = 1
-
-        while i < n:
-            c = line[i]
-            if c == '_' and header:
-                new += bytearray(' ', encoding)
-                i = i+1
-            elif c != ESCAPE:
-                new += bytearray(c, encoding)
-                i = i+1
-            elif i+1 == n and not partial:
-                partial = 1
-                break
-            elif i+1 < n and line[i+1] == ESCAPE:
-                new += bytearray(ESCAPE, encoding)
-                i = i+2
-            elif i+2 < n and ishex(line[i+1]) and ishex(line[i+2]):
-                new.append(unhex(line[i+1:i+3]))
-                i = i+3
+            self.handle_data('&{};'.format(name))
+
+    def handle_charref(self, name):
+        try:
+            if name.lower().startswith('x'):
+                char = unichr(int(name[1:], 16))
             else:
-                # Bad escape sequence -- leave it in
-                new += bytearray(c, encoding)
-                i = i+1
-        if not partial:
-            ret.append(new.decode(encoding))
-            new = bytearray()
-    if new:
-        ret.append(new.decode(encoding))
-    return '\n'.join(ret)
+                char = unichr(int(name))
+        except ValueError:
+            char = '&#{};'.format(name)
+        self.handle_data(char)
+
+    def _break(self, lines):
+        self._newlines = max(self._newlines, lines)
+
+    def _write(self, text):
+        if self.is_full():
+            return
+        if self.size:
+            if self._newlines:
+                self.output.append('\n' * self._newlines)
+            elif self._space:
+                self.output.append(' ')
+        self._newlines = 0
+        self._space = False
+        self.output.append(text)
+        self.size += len(text)
+
+    def get_text(self):
+        return ''.join(self.output)
+
+
+def html_to_text(html, max_size=None, chunk_size=8192):
+    """Convert HTML to text with the lightweight `HTMLTextConverter`.
+
+    :type max_size: int
+    :param max_size:
+        Stop converting when the text has reached the given number of
+        characters. The text is then suffixed with "…".
+
+    """
+    parser = HTMLTextConverter(max_size=max_size)
+    for i in xrange(0, len(html), chunk_size):
+        parser.feed(html[i:i + chunk_size])
+        if parser.is_full():
+            return utils.trim_too_long(parser.get_text(), max_size)
+    parser.close()
+    return parser.get_text().strip()
+
+
+def html2text_to_text(html, max_size=None):
+    """Convert HTML to text by html2text. Slower, but better formatted."""
+    # Imported here, since it's slow to import and seldom used
+    import html2text
+    txt = html2text.html2text(html)
+    txt = txt.replace('&lt;', '<')
+    txt = txt.replace('&gt;', '>')
+    txt = cleanup_whitespace(txt)
+    if max_size:
+        txt = utils.trim_too_long(txt, max_size)
+    return txt
+
+
+""" The available converters from HTML to text, by name """
+html_converters = {
+        'simple': html_to_text,
+        'html2text': html2text_to_text,
+        }
+
+
+def decode_quoted_printable(input, header=0, encoding='utf-8'):
+    """As quopri.decodestring, but with Unicode support.
+
+    The input is converted to bytes in the given encoding and decoded in bulk
+    by `binascii.a2b_qp`, instead of character by character. Soft line breaks
+    are joined, while blank lines and hard line breaks are preserved.
+
+    Invalid escape sequences are left in, and bytes that are not valid in the
+    given encoding are replaced, to not fail on badly encoded mails.
+
+    :type input: unicode or str
+    :param input: The quoted-printable text
+
+    :param header:
+        If True, underscores are decoded as spaces, as in encoded headers.
+
+    :rtype: unicode
+
+    """
+    if isinstance(input, unicode):
+        input = input.encode(encoding, 'replace')
+    return binascii.a2b_qp(input, header=bool(header)).decode(encoding,
+                                                              'replace')
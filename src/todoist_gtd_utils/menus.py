@@ -34,7 +34,9 @@ def menu_project(api, project, extra=None):
             print("Project deleted. Most commands now doesn't work.")
 
     def activate_project():
-        # TODO: check if project is already active
+        if project.is_active():
+            print("Project is already active")
+            return
         targetprojects = api.get_targetprojects()
         if len(targetprojects) == 1:
             parent = targetprojects[0]
@@ -215,7 +217,7 @@ def menu_item(api, item, extra=None):
         item.print_note_preview()
 
     def activate_item():
-        targetprojects = api.get_targetprojects(self)
+        targetprojects = api.get_targetprojects()
         if len(targetprojects) == 1:
             parent = targetprojects[0]
         elif len(targetprojects) > 1:
@@ -0,0 +1,176 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Buffered output to the terminal.
+
+Listings are collected in a `Writer`, and written in one go when done. Colors
+are added from precomputed ANSI codes, and skipped when the output is not a
+terminal, e.g. when piped to a file. Output longer than the terminal is shown
+through $PAGER.
+
+Example::
+
+    with output.Writer() as out:
+        out.line("Items:", attrs=['bold'])
+        for item in items:
+            out.line(unicode(item))
+
+"""
+
+from __future__ import unicode_literals
+
+import fcntl
+import os
+import re
+import struct
+import subprocess
+import sys
+import termios
+
+from termcolor import ATTRIBUTES, COLORS, HIGHLIGHTS, RESET
+
+""" Pager to use when $PAGER is not set """
+default_pager = 'less'
+
+""" Options for less, if not set by the user. Keeps colors, and quits if the
+output fits on one screen. """
+default_less = 'FRX'
+
+_ansi_re = re.compile(r'\x1b\[[0-9;]*m')
+
+# ANSI codes to put before text in a style, by (color, on_color, attrs)
+_templates = {}
+
+
+def get_terminal_size():
+    """Return the terminal size, in number of characters.
+
+    Asks the terminal of stdout, stdin or stderr directly, instead of running
+    `stty` for every line that is printed. Falls back to $LINES and $COLUMNS,
+    or 24x80, when not in a terminal.
+
+    """
+    for fd in (1, 0, 2):
+        try:
+            raw = fcntl.ioctl(fd, termios.TIOCGWINSZ, b'\0' * 8)
+            rows, columns = struct.unpack(b'hhhh', raw)[:2]
+        except (IOError, OSError):
+            continue
+        if rows and columns:
+            return rows, columns
+    try:
+        return int(os.environ['LINES']), int(os.environ['COLUMNS'])
+    except (KeyError, ValueError):
+        return 24, 80
+
+
+def get_style(color=None, on_color=None, attrs=None):
+    """Return the ANSI codes for a style, like termcolor's `colored`."""
+    key = (color, on_color, tuple(attrs or ()))
+    ret = _templates.get(key)
+    if ret is None:
+        # In the same order as termcolor puts them
+        codes = [ATTRIBUTES[attr] for attr in reversed(key[2])]
+        if on_color:
+            codes.append(HIGHLIGHTS[on_color])
+        if color:
+            codes.append(COLORS[color])
+        ret = _templates[key] = ''.join('\033[{}m'.format(c) for c in codes)
+    return ret
+
+
+def strip_colors(text):
+    """Remove ANSI color codes from text"""
+    return _ansi_re.sub('', text)
+
+
+def is_terminal(stream):
+    isatty = getattr(stream, 'isatty', None)
+    return bool(isatty and isatty())
+
+
+def use_colors(stream):
+    """Tell if colors should be written to a stream"""
+    if os.getenv('ANSI_COLORS_DISABLED') is not None:
+        return False
+    return is_terminal(stream)
+
+
+class Writer(object):
+    """Collect lines of output, and write them at once.
+
+    Usable as a context manager, which writes the output at the end.
+
+    """
+
+    def __init__(self, stream=None, color=None, pager=True):
+        """
+        :type stream: file
+        :param stream: Where to write. Default is stdout.
+
+        :type color: bool
+        :param color:
+            If colors should be written. Default is only if the stream is a
+            terminal.
+
+        :type pager: bool
+        :param pager: If output longer than the terminal should be paged.
+
+        """
+        self.stream = stream or sys.stdout
+        if color is None:
+            color = use_colors(self.stream)
+        self.color = color
+        self.pager = pager
+        self.lines = []
+
+    def line(self, text='', color=None, on_color=None, attrs=None):
+        """Add a line, optionally in a style.
+
+        The style is given as in termcolor's `colored`.
+
+        """
+        if self.color and (color or on_color or attrs):
+            text = get_style(color, on_color, attrs) + text + RESET
+        self.lines.append(text)
+
+    def get_text(self):
+        """Return the collected output"""
+        text = '\n'.join(self.lines) + '\n' if self.lines else ''
+        if not self.color:
+            # Previews of items and projects are already colored
+            text = strip_colors(text)
+        return text
+
+    def page(self, data):
+        """Show data through the pager. Return False if that failed."""
+        env = os.environ.copy()
+        env.setdefault('LESS', default_less)
+        try:
+            p = subprocess.Popen(env.get('PAGER') or default_pager,
+                                 shell=True, stdin=subprocess.PIPE, env=env)
+            p.communicate(data)
+        except (IOError, OSError):
+            return False
+        return p.returncode == 0
+
+    def flush(self):
+        """Write the collected output, and start over"""
+        text = self.get_text()
+        self.lines = []
+        if not text:
+            return
+        encoding = getattr(self.stream, 'encoding', None) or 'utf-8'
+        data = text.encode(encoding, 'replace')
+        if (self.pager and is_terminal(self.stream) and
+                text.count('\n') >= get_terminal_size()[0]):
+            if self.page(data):
+                return
+        self.stream.write(data)
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
@@ -0,0 +1,187 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+"""Parsing of Todoist's recurring dates.
+
+Todoist's `date_string` is converted to Everdo's schedule object. The formats
+are regular expressions, compiled once, and the results are cached, since a
+lot of items share the same date strings. `Everdo_Schedule` is defined here,
+and not in the everdo module, so parsing dates doesn't load the exporter.
+Some mismatches with Everdo:
+
+- Everdo doesn't support time, only dates. Times are ignored.
+
+- Everdo doesn't have ordinal weekdays, like "every 2nd monday", or
+  intervals of several workdays, like "every 2 workdays". These raise
+  `UnhandledDateError`, instead of giving a wrong schedule.
+
+- Every workday is a weekly schedule on monday to friday.
+
+"""
+
+from __future__ import unicode_literals
+
+import re
+
+from . import exceptions
+
+""" Names of the weekdays, by the number Everdo uses for them """
+weekday_numbers = {'mon': 1, 'tue': 2, 'wed': 3, 'thu': 4, 'fri': 5,
+                   'sat': 6, 'sun': 7}
+
+_weekday = (r'(?:mon|tue(?:s)?|wed(?:nes)?|thu(?:rs)?|fri|sat(?:ur)?|sun)'
+            r'(?:day)?')
+_ordinal = r'(?:1st|2nd|3rd|4th|5th|first|second|third|fourth|fifth|last)'
+
+""" The recurring date formats, as regular expressions. Also used by
+`dates.dateformats` for validating input. """
+recurrence_formats = (
+    r'(?:every|after) (?:(?:\d+|other) )?'
+    r'(?:workday|weekday|day|week|month|year)s?',
+    r'every (?:other )?{0}(?:(?:, ?| and ){0})*'.format(_weekday),
+    r'every {} {}'.format(_ordinal, _weekday),
+    r'every [0-3]?[0-9](?:st|nd|rd|th)?',
+)
+
+""" Optional time after the date. Ignored, as Everdo doesn't support time. """
+_time = (r'(?: at \d{1,2}(?::\d\d)?(?: ?[ap]m)?'
+         r'| \d{1,2}:\d\d(?: ?[ap]m)?| \d{1,2} ?[ap]m)?')
+
+_interval_re = re.compile(
+    r'^(?:every|after) (?:(?P<amount>\d+|other) )?'
+    r'(?P<unit>workday|weekday|day|week|month|year)s?' + _time + '$')
+_weekdays_re = re.compile(
+    r'^every (?P<other>other )?(?P<days>{0}(?:(?:, ?| and ){0})*)'
+    .format(_weekday) + _time + '$')
+_monthday_re = re.compile(
+    r'^every (?P<day>[0-3]?[0-9])(?:st|nd|rd|th)?' + _time + '$')
+_shorthand_re = re.compile(
+    r'^(?P<unit>dai|week|month|year)ly' + _time + '$')
+_weekday_split_re = re.compile(r', ?| and ')
+
+_schedule_types = {'day': 'Daily', 'dai': 'Daily', 'week': 'Weekly',
+                   'month': 'Monthly', 'year': 'Yearly'}
+
+
+class Everdo_Schedule(dict):
+    """Handle the Schedule model for Everdo.
+
+    Based on best guesses… Example::
+
+        "schedule": {
+            "type": "Daily",
+            "period": 1,
+            "daysOfWeek": null,
+            "daysOfMonth": null,
+            "daysOfYear": null,
+            "limit": null,
+            "endDate": null,
+            "autoDueDate": true
+        },
+
+    """
+    def __init__(self, type=None, period=None, daysOfWeek=None,
+                 daysOfMonth=None, daysOfYear=None, limit=None, endDate=None,
+                 autoDueDate=True):
+        vars = locals()
+        del vars['self']
+        super(Everdo_Schedule, self).__init__(**vars)
+
+
+def _parse_interval(m):
+    amount = m.group('amount')
+    if amount == 'other':
+        amount = 2
+    else:
+        amount = int(amount or 1)
+    unit = m.group('unit')
+    if unit in ('workday', 'weekday'):
+        if amount != 1:
+            # Everdo can't repeat every n-th workday
+            return None
+        return Everdo_Schedule('Weekly', period=1,
+                               daysOfWeek=[1, 2, 3, 4, 5])
+    return Everdo_Schedule(_schedule_types[unit], period=amount)
+
+
+def _parse_weekdays(m):
+    days = sorted(set(weekday_numbers[d[:3]] for d in
+                      _weekday_split_re.split(m.group('days'))))
+    return Everdo_Schedule('Weekly', period=2 if m.group('other') else 1,
+                           daysOfWeek=days)
+
+
+def _parse_monthday(m):
+    day = int(m.group('day'))
+    if not 1 <= day <= 31:
+        return None
+    return Everdo_Schedule('Monthly', period=1, daysOfMonth=[day])
+
+
+def _parse_shorthand(m):
+    return Everdo_Schedule(_schedule_types[m.group('unit')], period=1)
+
+
+""" The parsers to try, in order """
+_parsers = (
+    (_interval_re, _parse_interval),
+    (_weekdays_re, _parse_weekdays),
+    (_monthday_re, _parse_monthday),
+    (_shorthand_re, _parse_shorthand),
+)
+
+""" Cache of parsed schedules, by normalized date string """
+_cache = {}
+
+""" Marker for cached date strings that couldn't be parsed """
+_unhandled = object()
+
+
+def normalize(datestring):
+    """Normalize a date string, for matching and caching.
+
+    Lowercased, with whitespace collapsed. The ! from "every!" is removed.
+
+    """
+    return ' '.join(datestring.lower().replace('!', '').split())
+
+
+def _parse(datestring):
+    for regex, parser in _parsers:
+        m = regex.match(datestring)
+        if m:
+            schedule = parser(m)
+            if schedule is not None:
+                return schedule
+    if 'every' in datestring or 'after' in datestring:
+        return _unhandled
+    # Not repeatable
+    return None
+
+
+def parse_recurrence(datestring):
+    """Convert Todoist's date string to Everdo's schedule object.
+
+    :type datestring: unicode
+    :param datestring: Todoist's `date_string` of an item.
+
+    :rtype: Everdo_Schedule
+    :return:
+        The schedule, or None if the date string is not recurring.
+
+    :raise UnhandledDateError:
+        If the date string is recurring, but in an unsupported format.
+
+    """
+    key = normalize(datestring)
+    try:
+        schedule = _cache[key]
+    except KeyError:
+        schedule = _cache[key] = _parse(key)
+    if schedule is _unhandled:
+        raise exceptions.UnhandledDateError(
+                "Unhandled date_string: {}".format(datestring))
+    if schedule is None:
+        return None
+    # A copy, in case it gets modified
+    return Everdo_Schedule(**schedule)
@@ -5,39 +5,39 @@
 
 from __future__ import unicode_literals
 
-import os
 import argparse
 import re
 import traceback
-import readline
-import getpass
-import requests
 
 from termcolor import cprint, colored
 
 from .utils import trim_whitespace, frontend_priority_to_api
-from . import exceptions
-
-dateformats = ('(after |every )?(mon|tues|wednes|thurs|fri|satur|sun)day',
-               '(after |every )?tomorrow',
-               'today',
-               'none',
-               '(after |every )?(\d+ )?(work)?day(s)?',
-               '(after |every )?next month', '(after |every )?next year',
-               '[0-3]?[0-9]\. [a-z]{3,6}( \d{4})?',
-               'in \d+ (day|week|month|year)s?',
-               )
-timeformats = ('[0-1][0-9]:[0-5][0-9]',)
+from . import completion
+from . import output
+from .output import get_terminal_size
+from .dates import DateGrammar, date_grammar
 
 
 # For mocking/testing behaviour
 raw_input2 = raw_input
 
 
+def _get_readline():
+    """Import readline on first prompt, instead of at startup.
+
+    Importing readline gives raw_input line editing, so it must be imported
+    before asking for input.
+
+    """
+    import readline
+    return readline
+
+
 def get_input(prompt):
     """Unicodify raw_input"""
     # Force unicodified input
     assert isinstance(prompt, unicode)
+    _get_readline()
     prompt = colored(prompt.encode('utf-8'), color='yellow')
     # TODO: How to check terminals' charset? LC_ALL?
     return unicode(raw_input2(prompt), 'utf-8')
@@ -75,7 +75,7 @@ def dialog_new_item(api, name=None, project=None):
         project_id = project['id']
 
     labels = ask_labels(api, default=parsed_input['labels'])
-    date = ask_filter('Date', dateformats, default=parsed_input['date'],
+    date = ask_filter('Date', date_grammar, default=parsed_input['date'],
                       category="date")
     priority = ask_priority(api, parsed_input['priority'] - 1)
 
@@ -141,7 +141,7 @@ def ask_project(api, default=None, prompt="Project"):
 
 def ask_date(api, default=None):
     """Ask user for a valid date"""
-    ret = ask_filter('Date', dateformats, default=default, category="date")
+    ret = ask_filter('Date', date_grammar, default=default, category="date")
     if ret and ret.lower() == 'none':
         # Special case for unsetting date
         return None
@@ -166,8 +166,8 @@ def ask_labels(api, default=None):
 def parse_item_content(api, content):
     """Get labels, projects and date out of a content string.
 
-    NOT as advanced as Todoist own parser. Does for instance not support
-    white space in labels and projects.
+    NOT as advanced as Todoist own parser, e.g. only a limited set of date
+    formats are supported.
 
     :rtype: list
     :return:
@@ -196,46 +196,45 @@ def parse_item_content(api, content):
 def parse_project(api, content):
     """Return first project found, and remove from content.
 
-    TODO: Only support projects without space in its name, for now.
+    Projects are given as #name. Names with spaces are supported.
 
     :rtype: tuple
     :return:
-        Tuple with three elements: New content, project name and TodoistProject
-        (elns). If no project was found, the last two elements are None, and
-        the first is unmodified.
+        Tuple with two elements: New content and TodoistProject. If no project
+        was found, the last element is None, and the content is unmodified.
 
     """
-    for p in re.findall('#(\w+)', content):
-        try:
-            p_obj = api.get_project_by_name(p)
-        except exceptions.NotFoundError:
-            continue
-        except exceptions.DuplicateError:
-            p_obj = api.get_projects_by_name(p)[0]
-        content = content.replace('#' + p, '')
-        return content, p_obj
-    return content, None
+    pattern, projects = api.get_name_pattern('projects')
+    if pattern is None:
+        return content, None
+    m = pattern.search(content)
+    if not m:
+        return content, None
+    return (content[:m.start()] + content[m.end():],
+            projects[m.group(1).lower()])
 
 
 def parse_labels(api, content):
     """Return labels found, and remove from content"""
+    pattern, labels = api.get_name_pattern('labels')
+    if pattern is None:
+        return content, []
     found_labels = []
-    for label in api.labels.all():
-        labelname = '@{}'.format(label['name'])
-        if labelname in content:
+    for m in pattern.finditer(content):
+        label = labels[m.group(1).lower()]
+        if label not in found_labels:
             found_labels.append(label)
-            content = content.replace(labelname, '')
-    return content, found_labels
+    return pattern.sub('', content), found_labels
 
 
 def parse_date(content):
     """Return first date format found, and remove from content"""
-    for d in dateformats:
-        m = re.search('({}( {})?)'.format(d, timeformats), content)
-        if m:
-            return (trim_whitespace(content.replace(m.groups()[0], '')),
-                    trim_whitespace(m.groups()[0]))
-    return content, None
+    parsed = date_grammar.search(content)
+    if not parsed:
+        return content, None
+    start, end = parsed.span
+    return (trim_whitespace(content[:start] + content[end:]),
+            trim_whitespace(parsed.text))
 
 
 def parse_priority(content):
@@ -252,6 +251,8 @@ def parse_priority(content):
 
 def login_dialog(api):
     """Authenticate user by asking for password."""
+    import getpass
+    import requests
     while not api.token:
         print("Not authenticated with Todoist")
         mail = get_input('E-mail address: ')
@@ -292,20 +293,8 @@ def _set_completer(choices):
     :param choices: If a dict, only its keys are used.
 
     """
-    if isinstance(choices, dict):
-        choices = choices.keys()
-    choices = sorted(choices)
-
-    # Stolen from
-    # http://stackoverflow.com/questions/187621/how-to-make-a-python-command-line-program-autocomplete-arbitrary-things-not-int
-    def completer(text, state):
-        options = [c for c in choices if c.startswith(text)]
-        try:
-            return options[state]
-        except IndexError:
-            return None
-
-    readline.set_completer(completer)
+    readline = _get_readline()
+    readline.set_completer(completion.get_completer(choices).complete)
     readline.parse_and_bind('tab: complete')
 
 
@@ -362,8 +351,7 @@ def ask_choice(prompt, choices, default=None, category='choice',
         raw = raw.strip()
         if raw in mapping:
             return mapping[raw]
-        raw = raw.lower()
-        matches = filter(lambda x: raw in x.lower(), mapping.keys())
+        matches = completion.get_matcher(mapping).search(raw, limit=20)
         if matches:
             try:
                 ret = ask_choice_of_list("Narrow down (CTRL+D to cancel):",
@@ -381,16 +369,29 @@ def ask_choice(prompt, choices, default=None, category='choice',
 def ask_filter(prompt, regex_choices, default=None, category='choice'):
     """Ask for input that must match one of the given regular expressions.
 
-    :type regex_choices: list of unicode
-    :param regex_choices: Regex expressions to match input with.
+    :type regex_choices: list of unicode or compiled patterns, or DateGrammar
+    :param regex_choices:
+        Regex expressions to match input with. A `DateGrammar` requires the
+        input to be a date, with an optional time.
 
     :rtype: unicode
     :return:
         The given input that matches at least one of the regular expresssions.
 
     """
-    if not isinstance(regex_choices, (list, tuple)):
-        regex_choices = [regex_choices]
+    if isinstance(regex_choices, DateGrammar):
+        # Input must be a whole date
+        is_valid = regex_choices.match
+        descriptions = regex_choices.formats
+    else:
+        if not isinstance(regex_choices, (list, tuple)):
+            regex_choices = [regex_choices]
+        patterns = [re.compile(r) if isinstance(r, basestring) else r
+                    for r in regex_choices]
+        descriptions = [p.pattern for p in patterns]
+
+        def is_valid(raw):
+            return any(p.search(raw) for p in patterns)
 
     prompt_str = '{}: '.format(prompt)
     if default:
@@ -402,14 +403,13 @@ def ask_filter(prompt, regex_choices, default=None, category='choice'):
             return default
         if raw == '?':
             print("Must match one of following regexes:")
-            for r in regex_choices:
-                print("- {}".format(r))
+            for d in descriptions:
+                print("- {}".format(d))
             print('')
             continue
         raw = raw.strip()
-        for r in regex_choices:
-            if re.search(r, raw):
-                return raw
+        if is_valid(raw):
+            return raw
         cprint("Invalid {}, please try again (? for help)"
                .format(category), color="red")
 
@@ -466,6 +466,12 @@ def ask_multichoice(prompt, choices, default=[], category='choice',
             return [mapping[i] for i in selections]
         print("Invalid {}: {}".format(category,
                                       separator.join(invalid_selections)))
+        matcher = completion.get_matcher(mapping)
+        for invalid in invalid_selections:
+            suggestions = matcher.search(invalid, limit=3)
+            if suggestions:
+                print("Instead of {}, did you mean: {}?".format(
+                    invalid, ', '.join(suggestions)))
         print("(return ? for overview)")
 
 
@@ -587,10 +593,13 @@ def present_choices(choices):
         choices = choices.keys()
     max_choice_length = max(choices, key=len)
     has_spaces = any(' ' in c for c in choices)
-    if max_choice_length > 50 or has_spaces:
-        print('Choices:\n{}'.format('\n'.join(sorted(choices))))
-    else:
-        print('Choices: {}'.format(', '.join(sorted(choices))))
+    with output.Writer() as out:
+        if max_choice_length > 50 or has_spaces:
+            out.line('Choices:')
+            for c in sorted(choices):
+                out.line(c)
+        else:
+            out.line('Choices: {}'.format(', '.join(sorted(choices))))
 
 
 def get_argparser(*args, **kwargs):
@@ -602,10 +611,3 @@ def get_argparser(*args, **kwargs):
     p.add_argument('--yes', action='store_true',
                    help="Assume yes on non-critical decisions")
     return p
-
-
-def get_terminal_size():
-    """Return the terminal size, in number of characters"""
-    # https://stackoverflow.com/questions/566746/how-to-get-linux-console-window-width-in-python
-    rows, columns = os.popen('stty size', 'r').read().split()
-    return int(rows), int(columns)
@@ -0,0 +1,106 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Testing the download of attachments."""
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import threading
+
+import mock
+
+from todoist_gtd_utils import attachments
+
+
+class FakeSession(object):
+    """Serve files from a dict, and count the requests"""
+
+    def __init__(self, files):
+        self.files = files
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None, stream=False):
+        with self.lock:
+            self.requests.append((url, headers))
+        response = mock.Mock()
+        response.headers = {'ETag': '"v1"'}
+        if url not in self.files:
+            response.status_code = 404
+            response.raise_for_status.side_effect = Exception("Not found")
+        elif (headers or {}).get('If-None-Match') == '"v1"':
+            response.status_code = 304
+        else:
+            response.status_code = 200
+            data = self.files[url]
+            response.iter_content.return_value = [data[:3], data[3:]]
+        return response
+
+
+def get_attachment(url, size=None):
+    return {'file_url': url, 'file_name': url.rsplit('/', 1)[-1],
+            'file_size': size}
+
+
+def test_download_all():
+    directory = tempfile.mkdtemp()
+    try:
+        session = FakeSession({'http://x/a.txt': b'aaaaaa',
+                               'http://x/b.txt': b'bbbbbbbb'})
+        store = attachments.AttachmentStore(directory, session=session)
+        files = [get_attachment('http://x/a.txt', 6),
+                 get_attachment('http://x/b.txt'),
+                 get_attachment('http://x/a.txt', 6),
+                 get_attachment('http://x/missing.txt'),
+                 {'url': 'http://example.com', 'resource_type': 'url'}]
+        paths = attachments.download_all(store, files, workers=3)
+        assert sorted(paths) == ['http://x/a.txt', 'http://x/b.txt']
+        with open(paths['http://x/a.txt'], 'rb') as f:
+            assert f.read() == b'aaaaaa'
+        assert os.path.basename(paths['http://x/b.txt']) == 'b.txt'
+        assert len(session.requests) == 3
+
+        # Resumes from the saved index. Skipped by size, or by ETag.
+        session.requests = []
+        store = attachments.AttachmentStore(directory, session=session)
+        paths2 = attachments.download_all(store, files[:2])
+        assert paths2 == paths
+        assert session.requests == [('http://x/b.txt',
+                                     {'If-None-Match': '"v1"'})]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_content_addressed():
+    directory = tempfile.mkdtemp()
+    try:
+        session = FakeSession({'http://x/1/a.txt': b'same',
+                               'http://x/2/a.txt': b'same'})
+        store = attachments.AttachmentStore(directory, session=session)
+        p1 = store.fetch(get_attachment('http://x/1/a.txt'))
+        p2 = store.fetch(get_attachment('http://x/2/a.txt'))
+        assert p1 == p2
+        assert store.is_fetched('http://x/1/a.txt', 4)
+        assert not store.is_fetched('http://x/1/a.txt', 5)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_absolute_paths():
+    directory = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        os.chdir(directory)
+        session = FakeSession({'http://x/a.txt': b'a'})
+        store = attachments.AttachmentStore('files', session=session)
+        path = store.fetch(get_attachment('http://x/a.txt'))
+        os.chdir(cwd)
+        assert os.path.isabs(path)
+        assert os.path.isfile(path)
+        assert store.get_path('http://x/a.txt') == path
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory)
@@ -0,0 +1,60 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Testing tab completion."""
+
+from __future__ import unicode_literals
+
+from todoist_gtd_utils import completion
+
+choices = ['Inbox', 'Work', 'Workshop', 'Private', 'Wonderland', 'Økonomi']
+
+
+def test_prefix_matches():
+    c = completion.Completer(choices)
+    assert c.get_matches('Wor') == ['Work', 'Workshop']
+    assert c.get_matches('Work') == ['Work', 'Workshop']
+    assert c.get_matches('Ø') == ['Økonomi']
+    assert c.get_matches('') == sorted(choices)
+
+
+def test_substring_and_fuzzy_matches():
+    c = completion.Completer(choices)
+    assert c.get_matches('shop') == ['Workshop']
+    assert c.get_matches('OR') == ['Work', 'Workshop']
+    assert c.get_matches('wlnd') == ['Wonderland']
+    assert c.get_matches('xyz') == []
+
+
+def test_complete_states():
+    c = completion.Completer(choices)
+    assert c.complete('W', 0) == 'Wonderland'
+    assert c.complete('W', 1) == 'Work'
+    assert c.complete('W', 2) == 'Workshop'
+    assert c.complete('W', 3) is None
+
+
+def test_get_completer_cached():
+    c = completion.get_completer(choices)
+    assert completion.get_completer(list(reversed(choices))) is c
+    assert completion.get_completer(dict((k, 1) for k in choices)) is c
+    assert completion.get_completer(['other']) is not c
+
+
+def test_matcher_ranking():
+    m = completion.Matcher(['Shopping list', 'Work', 'Homework', 'Work/Shop',
+                            'Workshop', 'Networking', 'Wonderland'])
+    assert m.search('work') == ['Work', 'Workshop', 'Work/Shop', 'Homework',
+                                'Networking']
+    assert m.search('shop') == ['Shopping list', 'Work/Shop', 'Workshop']
+    assert m.search('SHOP', limit=1) == ['Shopping list']
+    # Subsequences only when nothing contains the text
+    assert m.search('wlnd') == ['Wonderland']
+    assert m.search('xyz') == []
+    assert m.search('  ') == []
+
+
+def test_get_matcher_cached():
+    m = completion.get_matcher(choices)
+    assert completion.get_matcher(list(reversed(choices))) is m
+    assert completion.get_completer(choices) is not m
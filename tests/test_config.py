@@ -0,0 +1,45 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Testing the config settings."""
+
+from __future__ import unicode_literals
+
+from pytest import raises
+
+from todoist_gtd_utils import config
+from todoist_gtd_utils import exceptions
+
+
+def test_defaults():
+    c = config.Config()
+    assert c.get_commalist('gtd', 'someday-projects') == ['Someday Maybe']
+    assert c.get_commalist('gtd', 'target-projects') == ['GTD']
+    assert c.get_commalist('cleanup', 'ignore-labels') == []
+
+
+def test_commalist_cached_until_changed():
+    c = config.Config()
+    c.set('gtd', 'target-projects', 'Work, Personal,,')
+    assert c.get_commalist('gtd', 'target-projects') == ['Work', 'Personal']
+    # Changing the returned list doesn't affect the cache
+    c.get_commalist('gtd', 'target-projects').append('Other')
+    assert c.get_commalist('gtd', 'target-projects') == ['Work', 'Personal']
+    version = c.version
+    c.set('gtd', 'target-projects', 'Work')
+    assert c.version > version
+    assert c.get_commalist('gtd', 'target-projects') == ['Work']
+
+
+def test_gtd_settings():
+    c = config.Config()
+    c.set('gtd', 'activate-before-due-date', '3')
+    c.set('cleanup', 'ignore-labels', 'waiting, office')
+    settings = c.get_gtd_settings()
+    assert c.get_gtd_settings() is settings
+    assert settings.activate_before_due_date == 3
+    assert settings.ignore_labels == ('waiting', 'office')
+    assert settings.someday_projects == ('Someday Maybe',)
+    c.set('gtd', 'activate-before-due-date', 'soon')
+    with raises(exceptions.ConfigError):
+        c.get_gtd_settings()
@@ -0,0 +1,119 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Testing the date grammar."""
+
+from __future__ import unicode_literals
+
+import time
+from datetime import date, datetime
+
+from todoist_gtd_utils import dates
+from todoist_gtd_utils import utils
+
+
+def test_search_kinds():
+    for text, found, kind in (
+            ('Call mom today', 'today', 'relative'),
+            ('Pay rent every month', 'every month', 'recurring'),
+            ('Water plants after 3 days', 'after 3 days', 'recurring'),
+            ('Dentist 12. may 2019', '12. may 2019', 'absolute'),
+            ('Read in 2 weeks', 'in 2 weeks', 'relative'),
+            ('Gym every 2nd monday', 'every 2nd monday', 'recurring'),
+            ('Remove date none', 'none', 'none'),
+            ):
+        parsed = dates.date_grammar.search(text)
+        assert parsed.text == found
+        assert parsed.kind == kind
+    assert dates.date_grammar.search('Nothing here') is None
+    assert dates.date_grammar.search('Birthday') is None
+    assert dates.date_grammar.search('Nonetheless') is None
+
+
+def test_search_time():
+    parsed = dates.date_grammar.search('Meeting tomorrow 09:30 at work')
+    assert parsed.text == 'tomorrow 09:30'
+    assert parsed.date == 'tomorrow'
+    assert parsed.time == '09:30'
+    assert parsed.date_string == 'tomorrow 09:30'
+
+
+def test_get_schedule():
+    parsed = dates.date_grammar.search('every week')
+    assert parsed.get_schedule()['type'] == 'Weekly'
+    assert dates.date_grammar.search('today').get_schedule() is None
+    assert dates.date_grammar.search('none').date_string is None
+
+
+def test_match():
+    assert dates.date_grammar.match(' every monday ').kind == 'recurring'
+    assert dates.date_grammar.match('12. may').kind == 'absolute'
+    assert dates.date_grammar.match('Call mom today') is None
+    assert dates.date_grammar.match('tomorrow blah') is None
+    assert dates.date_grammar.match('tomorrow 10:00').time == '10:00'
+
+
+def test_schedule_of_datestring():
+    assert dates.get_schedule('every week')['type'] == 'Weekly'
+    assert dates.get_schedule('daily')['type'] == 'Daily'
+    assert dates.get_schedule('tomorrow') is None
+    assert dates.get_schedule('') is None
+
+
+def test_custom_grammar():
+    grammar = dates.DateGrammar(('today', 'tomorrow'))
+    assert grammar.search('every monday') is None
+    assert grammar.search('Do it TODAY').date == 'TODAY'
+
+
+def test_resolve_date():
+    today = date(2019, 5, 8)  # A wednesday
+    for datestring, expected in (
+            ('today', date(2019, 5, 8)),
+            ('tomorrow', date(2019, 5, 9)),
+            ('friday', date(2019, 5, 10)),
+            ('monday', date(2019, 5, 13)),
+            ('wednesday', date(2019, 5, 8)),
+            ('every monday', date(2019, 5, 13)),
+            ('10 days', date(2019, 5, 18)),
+            ('3 workdays', date(2019, 5, 13)),
+            ('after 2 days', date(2019, 5, 10)),
+            ('every day', date(2019, 5, 8)),
+            ('next month', date(2019, 6, 1)),
+            ('next year', date(2020, 1, 1)),
+            ('in 2 weeks', date(2019, 5, 22)),
+            ('in 1 month', date(2019, 6, 8)),
+            ('1. may', date(2020, 5, 1)),
+            ('17. May', date(2019, 5, 17)),
+            ('24. dec 2021', date(2021, 12, 24)),
+            ('31. feb', None),
+            ('every 2nd monday', None),
+            ):
+        assert dates.resolve_date(datestring, today) == expected
+
+
+def test_add_months():
+    assert dates.add_months(date(2019, 1, 31), 1) == date(2019, 2, 28)
+    assert dates.add_months(date(2019, 11, 15), 3) == date(2020, 2, 15)
+
+
+def test_get_due_date_utc():
+    now = datetime(2019, 5, 8, 12, 0)
+    due = utils.parse_utc_to_datetime(
+            dates.get_due_date_utc('tomorrow', now))
+    local = datetime(2019, 5, 9, 23, 59, 59)
+    assert due == datetime.utcfromtimestamp(time.mktime(local.timetuple()))
+    due = utils.parse_utc_to_datetime(
+            dates.get_due_date_utc('today 09:30', now))
+    local = datetime(2019, 5, 8, 9, 30)
+    assert due == datetime.utcfromtimestamp(time.mktime(local.timetuple()))
+    assert dates.get_due_date_utc('none', now) is None
+    assert dates.get_due_date_utc('', now) is None
+    assert dates.get_due_date_utc('Birthday', now) is None
+
+
+def test_is_no_date():
+    assert dates.is_no_date('')
+    assert dates.is_no_date(None)
+    assert dates.is_no_date(' None')
+    assert not dates.is_no_date('every 2nd monday')
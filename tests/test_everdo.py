@@ -0,0 +1,257 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Testing the Everdo file format."""
+
+from __future__ import unicode_literals
+
+import io
+import gzip
+import json
+
+from pytest import raises
+
+from todoist_gtd_utils import everdo
+
+from test_init import get_blank_api
+
+
+def get_everdo_file():
+    """Return an Everdo file with some data"""
+    edo = everdo.Everdo_File()
+    tag = everdo.Everdo_Tag('l', 'Kontor')
+    edo.add_tag(tag, {'id': 1})
+    project = everdo.Everdo_Project('a', 'Prosjekt «X»',
+                                    tags=[tag.data['id']])
+    edo.add_item(project, {'id': 2})
+    action = everdo.Everdo_Action(project, 'a', 'Gjør noe\nmed æøå',
+                                  note='Line 1\n\n  Line 2')
+    edo.add_item(action, {'id': 3})
+    return edo
+
+
+def as_json(records):
+    """Return records as they are after a JSON roundtrip"""
+    return json.loads(json.dumps([r.to_dict() for r in records]))
+
+
+def test_export():
+    edo = get_everdo_file()
+    f = io.BytesIO()
+    edo.export(f)
+    data = json.loads(f.getvalue().decode('utf-8'))
+    assert data['items'] == as_json(edo.items)
+    assert data['tags'] == as_json(edo.tags)
+    assert '\n        {\n' in f.getvalue().decode('utf-8')
+
+
+def test_export_compact():
+    edo = get_everdo_file()
+    f = io.BytesIO()
+    edo.export(f, compact=True)
+    raw = f.getvalue().decode('utf-8')
+    assert '\n' not in raw.replace('\\n', '')
+    data = json.loads(raw)
+    assert data['items'] == as_json(edo.items)
+
+
+def test_export_gzip():
+    edo = get_everdo_file()
+    f = io.BytesIO()
+    edo.export(f, compress=True)
+    f.seek(0)
+    data = json.loads(gzip.GzipFile(fileobj=f).read().decode('utf-8'))
+    assert data['tags'] == as_json(edo.tags)
+
+
+def test_export_empty():
+    f = io.BytesIO()
+    everdo.Everdo_File().export(f)
+    assert json.loads(f.getvalue().decode('utf-8')) == {'items': [],
+                                                        'tags': []}
+
+
+def test_gen_uuid():
+    assert everdo.gen_uuid() != everdo.gen_uuid()
+    eid = everdo.gen_uuid('item', 12345)
+    assert eid == everdo.gen_uuid('item', 12345)
+    assert eid != everdo.gen_uuid('project', 12345)
+    assert len(eid) == 32
+    assert eid == eid.upper()
+
+
+def test_export_manifest(tmpdir):
+    filename = str(tmpdir.join('manifest.json'))
+    edo = get_everdo_file()
+    manifest = everdo.Everdo_Manifest(filename)
+    f = io.BytesIO()
+    assert edo.export(f, manifest=manifest) == {'items': 2, 'tags': 1}
+    data = json.loads(f.getvalue().decode('utf-8'))
+    assert len(data['items']) == 2
+    assert len(data['tags']) == 1
+    manifest.save()
+
+    # Only changed items gets exported the next time
+    edo.items[1].data['title'] = 'Changed'
+    edo.items[1].data['created_on'] += 100
+    edo.items[0].data['created_on'] += 100
+    manifest = everdo.Everdo_Manifest(filename)
+    f = io.BytesIO()
+    assert edo.export(f, manifest=manifest) == {'items': 1, 'tags': 0}
+    data = json.loads(f.getvalue().decode('utf-8'))
+    assert [i['id'] for i in data['items']] == [edo.items[1].data['id']]
+    assert data['tags'] == []
+
+    # Or only the given records
+    f = io.BytesIO()
+    assert edo.export(f, items=[], tags=edo.tags) == {'items': 0, 'tags': 1}
+
+
+def test_iter_everdo_file():
+    edo = get_everdo_file()
+    for kwargs in ({}, {'compact': True}, {'compress': True}):
+        f = io.BytesIO()
+        edo.export(f, **kwargs)
+        f.seek(0)
+        records = list(everdo.iter_everdo_file(f, chunk_size=7))
+        assert records == ([('items', i) for i in as_json(edo.items)] +
+                           [('tags', t) for t in as_json(edo.tags)])
+
+
+def test_iter_everdo_file_other_data():
+    raw = '{"version": 12.5, "items": [], "tags": [{"id": "ø"}]}'
+    f = io.BytesIO(raw.encode('utf-8'))
+    assert list(everdo.iter_everdo_file(f, chunk_size=3)) == [
+        ('tags', {'id': 'ø'})]
+    f = io.BytesIO(b'{}')
+    assert list(everdo.iter_everdo_file(f)) == []
+
+
+def test_records_are_compact():
+    edo = get_everdo_file()
+    project, action = edo.items
+    assert not hasattr(action, '__dict__')
+    assert action.data is action
+    assert action['parent_id'] == project['id']
+    assert 'parent_id' not in project
+    assert project.get('parent_id') is None
+    action['note'] += '\nLine 3'
+    assert action.to_dict()['note'].endswith('Line 3')
+    assert set(action.to_dict()) == set(action.keys())
+    with raises(KeyError):
+        action['nonexisting'] = 1
+    with raises(KeyError):
+        project['parent_id']
+    # Equal by content, so not hashable
+    with raises(TypeError):
+        set([action])
+
+
+def test_validate():
+    edo = get_everdo_file()
+    assert edo.validate() == []
+
+    project, action = edo.items
+    note = everdo.Everdo_Note(action, 'i', 'Note in inbox', tags=['nope'])
+    edo.add_item(note, {'id': 4})
+    orphan = everdo.Everdo_Action(None, 'r', 'Orphan', contact_id='gone')
+    orphan['parent_id'] = 'missing'
+    edo.add_item(orphan, {'id': 5})
+    scheduled = everdo.Everdo_Action(project, 's', 'Scheduled',
+                                     id=orphan['id'])
+    edo.add_item(scheduled, {'id': 6})
+    problems = edo.validate()
+    assert len(problems) == 8
+    for expected in ("Parent {} is not a project".format(action['id']),
+                     "Only actions can be in the inbox",
+                     "Tag nope doesn't exist",
+                     "Parent missing doesn't exist",
+                     "Contact gone doesn't exist",
+                     "Archived without completed_on",
+                     "Scheduled without start_date",
+                     "Duplicate item id"):
+        assert any(expected in p for p in problems), expected
+
+    # Only the given records are checked, with references to all of them
+    assert edo.validate([edo.items[0]], []) == []
+    problems = edo.validate([orphan], [])
+    assert len(problems) == 3
+
+
+def get_importer():
+    """Return an importer into a blank api, with Inbox and Someday Maybe"""
+    api = get_blank_api()
+    api.projects.add('Inbox')
+    api.projects.add('Someday Maybe')
+    api.commit()
+    return everdo.EverdoImporter(api)
+
+
+def get_commands(api):
+    """Return the commands of each commit to the mocked session"""
+    return [json.loads(c[1]['data']['commands'])
+            for c in api.session.post.call_args_list
+            if c[1]['data'].get('commands') not in (None, '[]')]
+
+
+def test_import_child_before_parent():
+    importer = get_importer()
+    api = importer.api
+    importer.add('items', {'id': 'A', 'type': 'a', 'list': 'a',
+                           'title': 'Action', 'parent_id': 'P'})
+    assert api.items.all() == []
+    importer.add('items', {'id': 'P', 'type': 'p', 'list': 'a',
+                           'title': 'Project'})
+    importer.finish()
+    project = api.get_project_by_name('Project')
+    items = api.items.all()
+    assert len(items) == 1
+    assert items[0]['project_id'] == project['id']
+    assert importer.pending == {}
+    assert importer.stats['items'] == 1
+
+
+def test_import_null_notes():
+    importer = get_importer()
+    api = importer.api
+    importer.add('items', {'id': 'P', 'type': 'p', 'list': 'a',
+                           'title': 'Project', 'note': None})
+    importer.add('items', {'id': 'A', 'type': 'a', 'list': 'a',
+                           'title': 'Action', 'parent_id': 'P',
+                           'note': None})
+    importer.add('items', {'id': 'B', 'type': 'a', 'list': 'a',
+                           'title': 'Other', 'note': 'A note'})
+    importer.finish()
+    assert len(api.items.all()) == 2
+    assert importer.stats['notes'] == 1
+
+
+def test_import_tags_as_labels():
+    importer = get_importer()
+    api = importer.api
+    api.labels.add('home')
+    api.commit()
+    # Tags come after the items in Everdo's files
+    importer.add('items', {'id': 'A', 'type': 'a', 'list': 'a',
+                           'title': 'Action', 'tags': ['T1', 'T2']})
+    importer.add('tags', {'id': 'T1', 'title': 'Big project', 'type': 'a'})
+    importer.add('tags', {'id': 'T2', 'title': 'home', 'type': 'l'})
+    importer.finish()
+    assert sorted(l['name'] for l in api.labels.all()) == ['Big_project',
+                                                            'home']
+    assert importer.stats['labels'] == 1
+    item = api.items.all()[0]
+    assert sorted(item['labels']) == sorted(l['id'] for l in api.labels.all())
+
+
+def test_import_commits_in_chunks():
+    importer = get_importer()
+    api = importer.api
+    api.max_commands = 10
+    for i in range(25):
+        importer.add('items', {'id': str(i), 'type': 'a', 'list': 'a',
+                               'title': 'Action {}'.format(i)})
+    importer.finish()
+    chunks = get_commands(api)[1:]  # After adding the projects
+    assert [len(c) for c in chunks] == [9, 9, 7]
+    assert len(api.items.all()) == 25
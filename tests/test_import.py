@@ -0,0 +1,61 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Testing what is loaded when importing the package."""
+
+from __future__ import unicode_literals
+
+import json
+import os
+import subprocess
+import sys
+
+""" Modules that should only be imported when used """
+lazy_modules = ('html2text', 'readline', 'getpass', 'todoist_gtd_utils.everdo')
+
+""" Script to check the startup of, with --help """
+script = os.path.join(os.path.dirname(__file__), os.pardir, 'bin',
+                      'todoist_add_mail_item')
+
+_import_script = '''
+import json, sys
+import todoist_gtd_utils
+import todoist_gtd_utils.mail
+import todoist_gtd_utils.menus
+print(json.dumps([m for m in sys.modules if sys.modules[m]]))
+'''
+
+_startup_script = '''
+import json, os, runpy, sys
+sys.argv = [sys.argv[1], '--help']
+stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+except SystemExit:
+    pass
+sys.stdout = stdout
+print(json.dumps([m for m in sys.modules if sys.modules[m]]))
+'''
+
+
+def get_modules(code, *args):
+    """Return the modules loaded by running code in a new interpreter"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(p for p in sys.path if p)
+    out = subprocess.check_output([sys.executable, '-c', code] + list(args),
+                                  env=env)
+    return json.loads(out)
+
+
+def test_lazy_modules():
+    modules = get_modules(_import_script)
+    assert 'todoist_gtd_utils.mail' in modules
+    for name in lazy_modules:
+        assert name not in modules
+
+
+def test_script_startup():
+    modules = get_modules(_startup_script, script)
+    assert 'todoist_gtd_utils.menus' in modules
+    for name in lazy_modules:
+        assert name not in modules
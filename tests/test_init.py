@@ -110,3 +110,207 @@ def test_get_project_by_name_duplicate():
     assert len(matches) == 2
     assert p1 in matches
     assert p2 in matches
+
+
+def test_commit_when_full():
+    api = get_blank_api()
+    api.max_commands = 3
+    api.projects.add('test1')
+    api.projects.add('test2')
+    assert not api.commit_when_full(margin=1)
+    assert len(api.queue) == 2
+    assert api.commit_when_full(margin=2)
+    assert len(api.queue) == 0
+
+
+def test_get_item_by_message_id():
+    api = get_filled_api()
+    item = api.items.all()[0]
+    api.notes.add(item['id'], "Date: today\nMessage-Id: <abc@example.com>\n")
+    assert api.get_item_by_message_id('<abc@example.com>') == item
+    assert api.get_item_by_message_id('<nope@example.com>') is None
+    # New notes are indexed after the index is built
+    other = api.items.all()[1]
+    api.notes.add(other['id'], "**Message-Id: <def@example.com>**")
+    assert api.get_item_by_message_id('<def@example.com>') == other
+    # And notes from syncs
+    api._update_state({'notes': [{'id': 1, 'item_id': other['id'],
+                                  'content': 'Message-Id: <ghi@example.com>'}]})
+    assert api.get_item_by_message_id('<ghi@example.com>') == other
+    api._update_state({'notes': [{'id': 1, 'item_id': other['id'],
+                                  'is_deleted': 1,
+                                  'content': 'Message-Id: <ghi@example.com>'}]})
+    assert api.get_item_by_message_id('<ghi@example.com>') is None
+
+
+def test_get_project_children():
+    api = get_blank_api()
+    a = api.projects.add('A', item_order=1, indent=1)
+    a1 = api.projects.add('A1', item_order=2, indent=2)
+    a11 = api.projects.add('A11', item_order=3, indent=3)
+    a2 = api.projects.add('A2', item_order=4, indent=2)
+    b = api.projects.add('B', item_order=5, indent=1)
+    api.commit()
+    children = api.get_project_children()
+    assert children[None] == [a, b]
+    assert children[a['id']] == [a1, a2]
+    assert children[a1['id']] == [a11]
+    assert b['id'] not in children
+    assert a.get_child_projects() == [a1, a11, a2]
+
+
+def test_get_archived_labels():
+    api = get_filled_api()
+    home, office = api.get_label_id(['home', 'office'])
+    item = api.items.all()[0]
+    item.update(content='Do A __Home __nolabel')
+    api.notes.add(item['id'], 'gtd_utils:removed_label:{}:office'
+                  .format(office))
+    other = api.items.all()[1]
+    archived = api.get_archived_labels()
+    assert archived.get(item['id']) == set((home, office))
+    assert len(archived.notes[item['id']]) == 1
+    assert archived.get(other['id']) == set()
+    assert archived.strip(item['content']) == 'Do A  __nolabel'
+    assert archived.strip(item['content'], set([office])) == item['content']
+    # Cached until next sync
+    assert api.get_archived_labels() is archived
+    api._update_state({'items': []})
+    assert api.get_archived_labels() is not archived
+
+
+def test_get_name_pattern():
+    api = get_filled_api()
+    pattern, labels = api.get_name_pattern('labels')
+    assert api.get_name_pattern('labels')[0] is pattern
+    assert set(labels) == set(['home', 'office', 'computer', 'phone'])
+    # Rebuilt when labels are added
+    api.labels.add('Home Office')
+    pattern, labels = api.get_name_pattern('labels')
+    m = pattern.search('Work @home office, today')
+    assert labels[m.group(1).lower()]['name'] == 'Home Office'
+    # And when renamed locally
+    labels['phone'].update(name='Phone call')
+    pattern, labels = api.get_name_pattern('labels')
+    assert pattern.search('Ask @phone call').group(1) == 'phone call'
+    assert 'phone' not in labels
+    project = api.get_project_by_name('Project Y')
+    api.get_name_pattern('projects')
+    project.update(name='Project W')
+    pattern, projects = api.get_name_pattern('projects')
+    assert pattern.search('Move to #project w').group(1) == 'project w'
+    # And by syncs
+    api._update_state({'labels': []})
+    assert api.get_name_pattern('labels')[1] is not labels
+
+
+def test_due_date_set_locally():
+    api = get_filled_api()
+    project = api.get_project_by_name('Project Y')
+    item = api.items.add('Do C', project_id=project['id'],
+                         date_string='tomorrow')
+    assert item['due_date_utc']
+    assert not item.is_due()
+    assert item.is_due(previous_days=2)
+    item.update(date_string='today')
+    assert item.is_due(previous_days=1)
+    assert not item.is_overdue()
+    due = item['due_date_utc']
+    # Left as it is, until synced, if not resolved locally
+    item.update(date_string='every 2nd monday')
+    assert item['due_date_utc'] == due
+    item.update(date_string='none')
+    assert item['due_date_utc'] is None
+
+
+def test_preview_cache():
+    api = get_filled_api()
+    project = api.get_project_by_name('Project Y')
+    item = api.items.add('Do C', project_id=project['id'], labels=[])
+    preview = item.get_short_preview()
+    key = (item['id'], 'item-oneliner')
+    assert api._previews[key][1] == preview
+    # Cached
+    with mock.patch.object(item, 'render_short_preview') as render:
+        assert item.get_short_preview() == preview
+        assert not render.called
+    # Local changes gives a new version
+    item.update(content='Changed')
+    assert 'Changed' in item.get_short_preview()
+    # Removed by syncs
+    api._update_state({'items': [{'id': item['id']}]})
+    assert key not in api._previews
+    item.get_short_preview()
+    api._update_state({'labels': [{'id': 1, 'name': 'new'}]})
+    assert api._previews == {}
+    # And by local renames
+    assert 'Project Y' in item.get_short_preview()
+    project.update(name='Project W')
+    assert 'Project W' in item.get_short_preview()
+    item.get_short_preview()
+    api.labels.all()[0].update(name='garden')
+    assert api._previews == {}
+    # Bounded
+    api.max_previews = 1
+    item.get_short_preview()
+    api.items.add('Do D', project_id=project['id'],
+                  labels=[]).get_short_preview()
+    assert len(api._previews) == 1
+
+
+def test_get_config_projects():
+    api = get_filled_api()
+    api.config.set('gtd', 'target-projects', 'Project X, Project Y')
+    targets = api.get_targetprojects()
+    assert [p['name'] for p in targets] == ['Project X', 'Project Y']
+    with mock.patch.object(api, 'get_project_by_name') as get:
+        assert api.get_targetprojects() == targets
+        assert not get.called
+    # Looked up again when the config changes
+    api.config.set('gtd', 'target-projects', 'Project Z')
+    assert [p['name'] for p in api.get_targetprojects()] == ['Project Z']
+    # or when projects are renamed or archived locally
+    api.config.set('gtd', 'target-projects', 'Project Y')
+    project = api.get_targetprojects()[0]
+    project.update(name='Project W')
+    with raises(exceptions.NotFoundError):
+        api.get_targetprojects()
+    api.config.set('gtd', 'target-projects', 'Project W')
+    api.get_targetprojects()
+    project.archive()
+    assert api._config_projects == {}
+    api.config.set('gtd', 'target-projects', 'Project Z')
+    # or when projects are synced
+    api._update_state({'projects': [{'id': 1, 'name': 'Project Z'}]})
+    with raises(exceptions.DuplicateError):
+        api.get_targetprojects()
+
+
+def test_project_sets():
+    api = get_blank_api()
+    gtd = api.projects.add('GTD', item_order=1, indent=1)
+    work = api.projects.add('Work', item_order=2, indent=2)
+    someday = api.projects.add('Someday Maybe', item_order=3, indent=1)
+    idea = api.projects.add('Idea', item_order=4, indent=2)
+    sub = api.projects.add('Sub idea', item_order=5, indent=3)
+    other = api.projects.add('Other', item_order=6, indent=1)
+    api.commit()
+    assert api.get_hibernated_ids() == set([someday['id'], idea['id'],
+                                            sub['id']])
+    assert api.get_active_ids() == set([gtd['id'], work['id']])
+    assert sub.is_hibernated() and not sub.is_active()
+    assert work.is_active() and not work.is_hibernated()
+    assert not other.is_hibernated() and not other.is_active()
+    assert api.get_project_sets() is api.get_project_sets()
+    # Updated when moved locally
+    idea.activate(gtd)
+    assert idea.is_active() and not idea.is_hibernated()
+    # and when archived, unarchived or deleted
+    for change in (other.archive, other.unarchive, other.delete):
+        sets = api.get_project_sets()
+        change()
+        assert api.get_project_sets() is not sets
+    # and by syncs
+    sets = api.get_project_sets()
+    api._update_state({'projects': [{'id': 1, 'name': 'New'}]})
+    assert api.get_project_sets() is not sets
@@ -8,6 +8,7 @@
 from __future__ import unicode_literals
 
 import io
+import tempfile
 
 import todoist_gtd_utils
 import todoist_gtd_utils.mail
@@ -139,6 +140,27 @@ representation of the e-mail.</p>
 
 """
 
+raw_mail_attachment = """From: Joakim <joakim.hovlandsvag@gmail.com>
+Subject: With attachment
+Message-ID: <attachment-001@example.com>
+Content-Type: multipart/mixed; boundary="randomstring"
+MIME-Version: 1.0
+
+--randomstring
+Content-Type: text/plain; charset="UTF-8"
+
+See the attached report.
+
+--randomstring
+Content-Type: application/pdf; name="report.pdf"
+Content-Disposition: attachment; filename="report.pdf"
+Content-Transfer-Encoding: base64
+
+JVBERi0xLjQKJeLjz9MKMSAwIG9iago8PC9UeXBlL0NhdGFsb2c+PgplbmRvYmoK
+
+--randomstring--
+"""
+
 raw_mail_html = """TODO
 """
 
@@ -257,3 +279,113 @@ def test_decode_quoted_printable_headers():
     for test, answer in tests:
         ret = todoist_gtd_utils.mail.decode_quoted_printable(test, True)
         assert ret == answer
+
+
+def test_decode_quoted_printable_keeps_blank_lines():
+    raw = "First line\n\nSecond =C3=A5 paragraph\n\n\nThird"
+    ret = todoist_gtd_utils.mail.decode_quoted_printable(raw)
+    assert ret == "First line\n\nSecond å paragraph\n\n\nThird"
+
+
+def test_decode_quoted_printable_soft_line_breaks():
+    raw = "This is a long line that=\n continues=\r\n here\nNext line"
+    ret = todoist_gtd_utils.mail.decode_quoted_printable(raw)
+    assert ret == "This is a long line that continues here\nNext line"
+
+
+def test_decode_quoted_printable_bad_data():
+    """Invalid escapes and bytes should not fail"""
+    ret = todoist_gtd_utils.mail.decode_quoted_printable("bad =ZZ and =F8")
+    assert ret.startswith("bad =ZZ and ")
+
+
+def test_html_to_text():
+    html = ("<html><head><style>p { color: red }</style>"
+            "<script>alert('hi')</script><title>Title</title></head>"
+            "<body><h1>The   header</h1>\n<p>A  &lt;fancy&gt;\n  "
+            "paragraph&#33; &aring;</p><ul><li>one</li><li>two</li></ul>"
+            "</body></html>")
+    txt = todoist_gtd_utils.mail.html_to_text(html)
+    assert txt == "The header\n\nA <fancy> paragraph! å\n\n- one\n- two"
+
+
+def test_html_to_text_max_size():
+    html = "<p>{}</p>".format("word " * 10000)
+    txt = todoist_gtd_utils.mail.html_to_text(html, max_size=100,
+                                              chunk_size=50)
+    assert len(txt) <= 100
+    assert txt.endswith('…')
+
+
+def test_html_converter_html2text():
+    p = todoist_gtd_utils.mail.SimpleMailParser(
+            io.StringIO(raw_mail_multipart), html_converter='html2text')
+    body = p.get_body_text()
+    assert 'HTML title' in body
+    assert "background-color" not in body
+
+
+def test_get_note_message_id():
+    p = todoist_gtd_utils.mail.SimpleMailParser(io.StringIO(raw_mail_utf8))
+    note = p.get_note()
+    assert '**Subject: RE: Søk is a word**' in note
+    assert (todoist_gtd_utils.mail.get_message_ids(note) ==
+            ['<eee2@mail.gmail.com>'])
+    assert todoist_gtd_utils.mail.get_message_ids('No mail here') == []
+
+
+def test_mail_structure():
+    p = todoist_gtd_utils.mail.SimpleMailParser(
+            io.StringIO(raw_mail_multipart))
+    assert len(p.body_parts) == 2
+    assert p.attachment_parts == []
+    assert p.get_attachments() == []
+    assert p.get_header('Subject') is p.get_header('subject')
+    assert p.get_body_text(color=False) == p.get_body_text(color=False)
+    assert p.get_header('X-Missing') is None
+
+
+def test_attachments():
+    p = todoist_gtd_utils.mail.SimpleMailParser(
+            io.StringIO(raw_mail_attachment))
+    attachments = p.get_attachments()
+    assert len(attachments) == 1
+    a_type, a_name, a_content = attachments[0]
+    assert a_type == 'application/pdf'
+    assert a_name == 'report.pdf'
+    assert a_content.startswith(b'%PDF-1.4')
+    body = p.get_body_text(color=False)
+    assert 'attached report' in body
+    assert '<application/pdf>' in body
+
+
+def test_from_binary_file():
+    raw = raw_mail_attachment.encode('utf-8')
+    p = todoist_gtd_utils.mail.SimpleMailParser.from_binary_file(
+            io.BytesIO(raw))
+    assert p.get_header('Subject') == 'With attachment'
+    assert len(p.get_attachments()) == 1
+
+
+def test_from_filename():
+    """Parse through mmap, in small chunks"""
+    with tempfile.NamedTemporaryFile() as f:
+        f.write(raw_mail_attachment.encode('utf-8'))
+        f.flush()
+        cls = todoist_gtd_utils.mail.SimpleMailParser
+        old_chunk_size = cls.chunk_size
+        cls.chunk_size = 10
+        try:
+            p = cls.from_filename(f.name)
+        finally:
+            cls.chunk_size = old_chunk_size
+    assert 'attached report' in p.get_body_text()
+    a_type, a_name, a_content = next(p.iter_attachments())
+    assert a_name == 'report.pdf'
+    assert a_content.startswith(b'%PDF-1.4')
+
+
+def test_from_filename_empty():
+    with tempfile.NamedTemporaryFile() as f:
+        p = todoist_gtd_utils.mail.SimpleMailParser.from_filename(f.name)
+    assert p.get_body_text() == ''
@@ -0,0 +1,61 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Testing the buffered output."""
+
+from __future__ import unicode_literals
+
+import io
+
+import mock
+from termcolor import colored
+
+from todoist_gtd_utils import output
+
+
+class FakeTerminal(io.BytesIO):
+    encoding = 'utf-8'
+
+    def isatty(self):
+        return True
+
+
+def test_writer_no_tty():
+    stream = io.BytesIO()
+    with output.Writer(stream) as out:
+        out.line('Items:', attrs=['bold'])
+        out.line(colored('Inbox', 'blue') + ' – 3 items')
+        assert stream.getvalue() == b''
+    assert stream.getvalue() == 'Items:\nInbox – 3 items\n'.encode('utf-8')
+
+
+def test_writer_colors():
+    stream = FakeTerminal()
+    with mock.patch.object(output, 'get_terminal_size',
+                           return_value=(24, 80)):
+        with output.Writer(stream) as out:
+            out.line('Items:', 'blue', attrs=['bold'])
+            out.line('plain')
+    assert (stream.getvalue().decode('utf-8') ==
+            colored('Items:', 'blue', attrs=['bold']) + '\nplain\n')
+
+
+def test_writer_pager():
+    stream = FakeTerminal()
+    with mock.patch.object(output, 'get_terminal_size',
+                           return_value=(2, 80)):
+        with mock.patch.object(output.Writer, 'page',
+                               return_value=True) as page:
+            with output.Writer(stream) as out:
+                for i in range(5):
+                    out.line('Line {}'.format(i))
+    assert page.called
+    assert stream.getvalue() == b''
+
+
+def test_get_terminal_size_fallback():
+    with mock.patch('fcntl.ioctl', side_effect=IOError):
+        with mock.patch.dict('os.environ', {'LINES': '40', 'COLUMNS': '120'}):
+            assert output.get_terminal_size() == (40, 120)
+        with mock.patch.dict('os.environ', clear=True):
+            assert output.get_terminal_size() == (24, 80)
@@ -0,0 +1,90 @@
+#!/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Testing the parsing of recurring dates."""
+
+from __future__ import unicode_literals
+
+import re
+
+from pytest import raises
+
+from todoist_gtd_utils import dates
+from todoist_gtd_utils import exceptions
+from todoist_gtd_utils import recurrence
+
+
+def test_not_recurring():
+    for datestring in ('today', 'tomorrow', '1. may', 'in 2 weeks'):
+        assert recurrence.parse_recurrence(datestring) is None
+
+
+def test_intervals():
+    for (datestring, typ, period) in (
+            ('every day', 'Daily', 1),
+            ('every 3 days', 'Daily', 3),
+            ('Every! 2 weeks', 'Weekly', 2),
+            ('after 6 months', 'Monthly', 6),
+            ('every other year', 'Yearly', 2),
+            ('every  month at 10:00', 'Monthly', 1),
+            ('daily', 'Daily', 1)):
+        schedule = recurrence.parse_recurrence(datestring)
+        assert schedule['type'] == typ
+        assert schedule['period'] == period
+        assert schedule['daysOfWeek'] is None
+
+
+def test_workdays():
+    for datestring in ('every workday', 'every 1 workday', 'every weekday'):
+        schedule = recurrence.parse_recurrence(datestring)
+        assert schedule['type'] == 'Weekly'
+        assert schedule['daysOfWeek'] == [1, 2, 3, 4, 5]
+    # Everdo can't repeat every n-th workday
+    for datestring in ('every 2 workdays', 'after 3 workdays'):
+        with raises(exceptions.UnhandledDateError):
+            recurrence.parse_recurrence(datestring)
+
+
+def test_weekdays():
+    for (datestring, period, days) in (
+            ('every monday', 1, [1]),
+            ('every sun 18:30', 1, [7]),
+            ('every other thursday', 2, [4]),
+            ('every fri, mon and wednesday', 1, [1, 3, 5])):
+        schedule = recurrence.parse_recurrence(datestring)
+        assert schedule['type'] == 'Weekly'
+        assert schedule['period'] == period
+        assert schedule['daysOfWeek'] == days
+
+
+def test_ordinal_weekdays():
+    # Not supported by Everdo
+    for datestring in ('every 2nd tuesday at 9am', 'every last friday'):
+        with raises(exceptions.UnhandledDateError):
+            recurrence.parse_recurrence(datestring)
+
+
+def test_monthdays():
+    schedule = recurrence.parse_recurrence('every 15th')
+    assert schedule['type'] == 'Monthly'
+    assert schedule['daysOfMonth'] == [15]
+
+
+def test_unhandled():
+    for datestring in ('every 45', 'every full moon', 'every 3rd day'):
+        with raises(exceptions.UnhandledDateError):
+            recurrence.parse_recurrence(datestring)
+    # Also when cached
+    with raises(exceptions.UnhandledDateError):
+        recurrence.parse_recurrence('every full moon')
+
+
+def test_cached_copies():
+    schedule = recurrence.parse_recurrence('every 4 weeks')
+    schedule['period'] = 1
+    assert recurrence.parse_recurrence('EVERY 4 WEEKS')['period'] == 4
+
+
+def test_dateformats():
+    for datestring in ('every 2nd monday', 'every other year', 'every 15'):
+        assert any(re.search(d, datestring) for d in dates.dateformats)
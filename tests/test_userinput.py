@@ -7,6 +7,8 @@ from __future__ import unicode_literals
 
 from todoist_gtd_utils import userinput
 
+from test_init import get_filled_api
+
 _latest_responses = []
 
 
@@ -58,8 +60,25 @@ def test_parse_simple_content():
 
 
 def test_parse_content():
-    # TODO: need to mock the api object first!
-    pass
+    api = get_filled_api()
+    api.labels.add('at work')
+    api.commit()
+    content, parsed = userinput.parse_item_content(
+            api, 'Mail a@home.com about #project x @Office @at work today')
+    assert content == 'Mail a@home.com about'
+    assert parsed['project']['name'] == 'Project X'
+    assert [l['name'] for l in parsed['labels']] == ['office', 'at work']
+    assert parsed['date'] == 'today'
+    assert parsed['priority'] == 4
+
+
+def test_parse_content_no_matches():
+    api = get_filled_api()
+    content, parsed = userinput.parse_item_content(
+            api, 'Talk with #someone @home-office')
+    assert content == 'Talk with #someone @home-office'
+    assert parsed['project'] is None
+    assert parsed['labels'] == []
 
 
 def test_parse_dates():
@@ -71,7 +90,16 @@ def test_parse_dates():
             ('Not after 10 days', 'Not', 'after 10 days'),
             ('What is 10 days this?', 'What is this?', '10 days'),
             ('every workday do something', 'do something', 'every workday'),
-            ('This is 1. may', 'This is', '1. may')):
+            ('This is 1. may', 'This is', '1. may'),
+            # Dates must be whole words
+            ('Birthday party tomorrow', 'Birthday party', 'tomorrow'),
+            ('Nonetheless call mom today', 'Nonetheless call mom', 'today'),
+            ('Update the daylog friday', 'Update the daylog', 'friday'),
+            ('Plan holidays every monday', 'Plan holidays', 'every monday'),
+            ('Read the Daily Mail', 'Read the Daily Mail', None),
+            # The longest date wins, and only that is removed
+            ('Gym every monday and friday', 'Gym', 'every monday and friday'),
+            ("Today's list today 10:00", "Today's list", 'today 10:00')):
         content, date = userinput.parse_date(input)
         assert exp_content == content
         assert exp_date == date
@@ -187,3 +215,23 @@ def test_ask_filter_regex():
     add_response('abc')
     answer = userinput.ask_filter("Age or chars", ['\d+', '\w+'], default='0')
     assert answer == 'abc'
+
+
+def test_ask_filter_date():
+    # Input must be a whole date
+    add_response('call me today')
+    add_response('tomorrow blah')
+    add_response('tomorrow 10:00')
+    answer = userinput.ask_filter("Date", userinput.date_grammar,
+                                  category='date')
+    assert answer == 'tomorrow 10:00'
+
+
+def test_ask_choice_narrow_down():
+    # The best match is the default when narrowing down
+    add_response("shop")
+    add_response("")
+    answer = userinput.ask_choice(prompt="",
+                                  choices=['Workshop', 'Shop', 'Shopping'])
+    assert answer == 1
+